@@ -0,0 +1,32 @@
+"""
+olist command line
+
+    python -m olist build orders|sellers|products|all [--force] [--jobs N]
+"""
+import argparse
+import time
+from olist.build import Build, TARGETS
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m olist')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="build training sets into data/build")
+    build.add_argument('targets', nargs='+', choices=TARGETS + ['all'])
+    build.add_argument('--force', action='store_true', help="rebuild all nodes")
+    build.add_argument('--jobs', type=int, default=None,
+                       help="number of nodes built in parallel")
+    build.add_argument('--build-dir', default=None)
+    args = parser.parse_args()
+
+    targets = TARGETS if 'all' in args.targets else args.targets
+    start = time.perf_counter()
+    report = Build(args.build_dir, args.jobs).run(targets, force=args.force)
+    print(report.to_string(index=False, float_format='{:.2f}'.format))
+    print(f"Total: {time.perf_counter() - start:.2f}s, "
+          f"{(report['status'] == 'built').sum()} built, "
+          f"{(report['status'] == 'fresh').sum()} fresh")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Peak memory allocated and time taken to build the training sets,
+in the default mode (deep copies of every table) and in lean mode
+(Olist(lean=True) inside `with copy_on_write():`), and to join
+order_items, orders and order_reviews with join_frames or merge.
+
+    python -m olist.benchmark
+"""
+import contextlib
+import time
+import tracemalloc
+import pandas as pd
+from olist.data import Olist, copy_on_write
+from olist.join import join_frames
+from olist.order import Order
+from olist.product import Product
+from olist.seller import Seller
+
+BUILDERS = {'orders': Order, 'sellers': Seller, 'products': Product}
+
+
+def track(function):
+    """
+    Returns (peak MB allocated, seconds) to call `function()`
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2**20, seconds
+
+
+def measure(builder, lean):
+    """
+    Returns (peak MB allocated, seconds) to build `builder` training data
+    """
+    def build():
+        with copy_on_write() if lean else contextlib.nullcontext():
+            builder(Olist(lean=lean)).get_training_data()
+    return track(build)
+
+
+def run():
+    """
+    Returns a DataFrame with the peak MB and seconds of each builder,
+    in default and lean mode
+    """
+    # Csv files are read once per process: exclude this from measures
+    Olist().get_data()
+
+    results = []
+    for lean in [False, True]:
+        for name, builder in BUILDERS.items():
+            peak, seconds = measure(builder, lean)
+            results.append({'builder': name, 'lean': lean,
+                            'peak_mb': peak, 'seconds': seconds})
+
+    results = pd.DataFrame(results).pivot(index='builder', columns='lean')
+    results.columns = [f"{stat}_{'lean' if lean else 'default'}"
+                       for stat, lean in results.columns]
+    results['peak_reduction'] = 1 - results['peak_mb_lean'] / results['peak_mb_default']
+    return results
+
+
+def run_join():
+    """
+    Returns a DataFrame with the peak MB and seconds of the join of
+    order_items, orders and order_reviews on order_id, with join_frames
+    and with a chain of merge
+    """
+    data = Olist().get_data()
+    frames = [data['order_items'], data['orders'], data['order_reviews']]
+
+    def merge():
+        frames[0].merge(frames[1], on='order_id').merge(frames[2], on='order_id')
+
+    results = []
+    for name, join in [('join_frames', lambda: join_frames(frames, on='order_id')),
+                       ('merge', merge)]:
+        peak, seconds = track(join)
+        results.append({'join': name, 'peak_mb': peak, 'seconds': seconds})
+    return pd.DataFrame(results).set_index('join')
+
+
+if __name__ == "__main__":
+    print(run().round(3).to_string())
+    print(run_join().round(3).to_string())
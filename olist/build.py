@@ -0,0 +1,230 @@
+"""
+Incremental build of the olist training sets, modelled as a DAG of
+nodes (cleaning, features, training sets) where each node is built from
+the saved DataFrames of its dependencies. Each node has a
+content fingerprint (hash of the csv files, of the source code it runs
+and of the fingerprints of its dependencies): only stale nodes are
+rebuilt, independent nodes run in parallel processes. The source code
+of a node is its build function and the olist modules it imports,
+found transitively in their import statements.
+
+    python -m olist build orders|sellers|products|all [--force] [--jobs N]
+"""
+import ast
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import pandas as pd
+from olist.data import Olist
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# name: (dependencies, function building the node)
+# Each function gets the built DataFrames of its dependencies as arguments
+NODES = {
+    'geolocation': ([], 'build_geolocation'),
+    'order_zip_codes': ([], 'build_order_zip_codes'),
+    'order_features': ([], 'build_order_features'),
+    'orders': (['order_features', 'geolocation', 'order_zip_codes'], 'build_orders'),
+    'sellers': ([], 'build_sellers'),
+    'products': ([], 'build_products')
+}
+
+TARGETS = ['orders', 'sellers', 'products']
+
+
+def build_geolocation():
+    # Cleaning: one location per zip code prefix
+    from olist.geolocation import Geolocation
+    return Geolocation().get_locations()
+
+
+def build_order_zip_codes():
+    # Cleaning: seller and customer zip codes of each order item
+    from olist.order import Order
+    return Order().get_item_zip_codes()
+
+
+def build_order_features():
+    # Features of all orders, delivered or not
+    from olist.order import Order
+    return Order().get_training_data(is_delivered=False)
+
+
+def build_orders(order_features, geolocation, order_zip_codes):
+    # Delivered orders of order_features, with the distance computed from
+    # the cleaned locations: same as get_training_data(with_distance_seller_customer=True)
+    from olist.order import get_distances
+    from olist.join import join_frames
+    delivered = order_features[order_features['order_status'] == 'delivered']
+    distances = get_distances(order_zip_codes, geolocation)
+    return join_frames([delivered, distances], on='order_id').dropna()
+
+
+def build_sellers():
+    from olist.seller import Seller
+    return Seller().get_training_data()
+
+
+def build_products():
+    from olist.product import Product
+    return Product().get_training_data()
+
+
+def hash_files(paths):
+    """
+    Returns a hash of the content of the files at `paths`
+    """
+    digest = hashlib.sha1()
+    for path in sorted(paths):
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def get_imports(tree):
+    """
+    Returns the set of olist modules imported in `tree` (an ast node),
+    e.g. {'order'} for `from olist.order import Order`
+    """
+    modules = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.level == 0:
+            names = [node.module]
+        elif isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        else:
+            continue
+        modules.update(name.split('.')[1] for name in names
+                       if name and name.startswith('olist.'))
+    return modules
+
+
+def get_sources(function):
+    """
+    Returns (source code of the build `function` of this module, paths of
+    the olist modules it imports, directly or through other olist modules)
+    """
+    with open(os.path.join(PACKAGE_DIR, 'build.py')) as f:
+        source = f.read()
+    node = next(node for node in ast.parse(source).body
+                if isinstance(node, ast.FunctionDef) and node.name == function)
+
+    paths, modules = [], list(get_imports(node))
+    while modules:
+        path = os.path.join(PACKAGE_DIR, f"{modules.pop()}.py")
+        if path not in paths and os.path.exists(path):
+            paths.append(path)
+            with open(path) as f:
+                modules.extend(get_imports(ast.parse(f.read())))
+    return ast.get_source_segment(source, node), sorted(paths)
+
+
+def run_node(name, build_dir):
+    """
+    Builds node `name` from its built dependencies in `build_dir`, saves
+    it there and returns (seconds, rows)
+    """
+    start = time.perf_counter()
+    build = Build(build_dir)
+    dependencies, function = NODES[name]
+    result = globals()[function](*[build.load(dependency) for dependency in dependencies])
+    result.to_pickle(build.get_path(name))
+    return time.perf_counter() - start, len(result)
+
+
+class Build:
+    """
+    Builds targets and their stale dependencies into `build_dir`
+    (default: data/build), recording node fingerprints in fingerprints.json
+    """
+    def __init__(self, build_dir=None, n_jobs=None):
+        if build_dir is None:
+            build_dir = os.path.join(os.path.dirname(Olist().get_csv_path()), 'build')
+        self.build_dir = build_dir
+        self.n_jobs = n_jobs
+        self.fingerprints_path = os.path.join(build_dir, 'fingerprints.json')
+
+    def get_path(self, name):
+        return os.path.join(self.build_dir, f"{name}.pkl")
+
+    def get_nodes(self, targets):
+        """
+        Returns the list of nodes needed by `targets`, dependencies first
+        """
+        nodes = []
+
+        def visit(name):
+            if name not in nodes:
+                for dependency in NODES[name][0]:
+                    visit(dependency)
+                nodes.append(name)
+
+        for target in targets:
+            visit(target)
+        return nodes
+
+    def get_fingerprints(self, nodes):
+        """
+        Returns a dict {node: fingerprint} for `nodes` (dependencies first)
+        """
+        csv_path = Olist().get_csv_path()
+        csv_fingerprint = hash_files([os.path.join(csv_path, f)
+                                      for f in os.listdir(csv_path) if f.endswith('.csv')])
+        fingerprints = {}
+        for name in nodes:
+            dependencies, function = NODES[name]
+            source, paths = get_sources(function)
+            parts = [name, csv_fingerprint if not dependencies else '',
+                     hashlib.sha1(source.encode()).hexdigest(), hash_files(paths)]
+            parts += [fingerprints[dependency] for dependency in dependencies]
+            fingerprints[name] = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+        return fingerprints
+
+    def run(self, targets, force=False):
+        """
+        Builds `targets` and returns a DataFrame timing report with:
+        'node', 'status' ('built' or 'fresh'), 'seconds', 'rows'
+        """
+        os.makedirs(self.build_dir, exist_ok=True)
+        nodes = self.get_nodes(targets)
+        fingerprints = self.get_fingerprints(nodes)
+        built = {}
+        if os.path.exists(self.fingerprints_path):
+            with open(self.fingerprints_path) as f:
+                built = json.load(f)
+
+        stale = [name for name in nodes if force or built.get(name) != fingerprints[name]
+                 or not os.path.exists(self.get_path(name))]
+        report = {name: {'node': name, 'status': 'fresh', 'seconds': 0.0, 'rows': None}
+                  for name in nodes}
+
+        # Submit each stale node as soon as its stale dependencies are built
+        pending, running = list(stale), {}
+        with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+            while pending or running:
+                for name in list(pending):
+                    if not any(dependency in pending or dependency in running.values()
+                               for dependency in NODES[name][0]):
+                        pending.remove(name)
+                        running[executor.submit(run_node, name, self.build_dir)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    seconds, rows = future.result()
+                    report[name].update(status='built', seconds=seconds, rows=rows)
+                    built[name] = fingerprints[name]
+                    with open(self.fingerprints_path, 'w') as f:
+                        json.dump(built, f, indent=2)
+
+        return pd.DataFrame(list(report.values()))
+
+    def load(self, name):
+        """
+        Returns the DataFrame of a built node
+        """
+        return pd.read_pickle(self.get_path(name))
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+
+class Cohort:
+    """
+    Cohorts of entities (sellers, customers...) by month of first
+    activity. `keys`, `dates` and `values` describe activity events (e.g.
+    one per sale): keys and months become integer codes, and every
+    (cohort, period) matrix is a single bincount over these codes, where
+    period is the number of months since the cohort month.
+    """
+    def __init__(self, keys, dates, values=None):
+        keys = np.asarray(keys)
+        dates = pd.to_datetime(pd.Series(np.asarray(dates)))
+        # Events without a date or a key belong to no cohort (factorize
+        # would give missing keys the code -1, i.e. the last entity)
+        known = dates.notna().to_numpy() & ~pd.isna(keys)
+        months = dates[known].dt.year.to_numpy() * 12 + dates[known].dt.month.to_numpy() - 1
+        codes, self.keys = pd.factorize(keys[known])
+        values = np.ones(len(codes)) if values is None\
+            else np.asarray(values, dtype=float)[known]
+
+        # Cohort month of each entity: its first month of activity
+        first_month = np.full(len(self.keys), months.max() if len(months) else 0)
+        np.minimum.at(first_month, codes, months)
+        self.first_month = months.min() if len(months) else 0
+        self.n_cohorts = first_month.max() - self.first_month + 1 if len(months) else 0
+        self.n_periods = months.max() - self.first_month + 1 if len(months) else 0
+
+        self.entity_cohorts = first_month - self.first_month
+        self.cohorts = self.entity_cohorts[codes]
+        self.periods = months - first_month[codes]
+        self.codes = codes
+        self.values = values
+
+    def accumulate(self, cells, weights=None):
+        # (cohort, period) matrix of the sums of `weights` over `cells`
+        size = self.n_cohorts * self.n_periods
+        return np.bincount(cells, weights=weights, minlength=size)\
+            .reshape(self.n_cohorts, self.n_periods)
+
+    def get_index(self):
+        start = pd.Timestamp(year=self.first_month // 12, month=self.first_month % 12 + 1, day=1)
+        return pd.date_range(start, periods=self.n_cohorts, freq='MS', name='cohort')
+
+    def to_frame(self, matrix):
+        # Periods after the last month of data are not observed yet: NaN
+        matrix = matrix.astype(float)
+        observed = np.add.outer(np.arange(self.n_cohorts), np.arange(self.n_periods))
+        matrix[observed >= self.n_periods] = np.nan
+        return pd.DataFrame(matrix, index=self.get_index(),
+                            columns=pd.RangeIndex(self.n_periods, name='period'))
+
+    def get_sizes(self):
+        """
+        Returns a Series with the number of entities of each cohort
+        """
+        return pd.Series(np.bincount(self.entity_cohorts, minlength=self.n_cohorts),
+                         index=self.get_index(), name='size')
+
+    def get_active(self):
+        """
+        Returns a (cohort x period) DataFrame with the number of entities
+        of each cohort active in each period
+        """
+        cells = self.cohorts * self.n_periods + self.periods
+        # Count each entity once per period: unique (entity, cell) pairs
+        entity_cells = np.unique(self.codes.astype(np.int64) * self.n_cohorts * self.n_periods
+                                 + cells)
+        return self.to_frame(self.accumulate(entity_cells % (self.n_cohorts * self.n_periods)))
+
+    def get_retention(self):
+        """
+        Returns a (cohort x period) DataFrame with the share of entities
+        of each cohort active in each period (1 in period 0)
+        """
+        return self.get_active().div(self.get_sizes(), axis=0)
+
+    def get_values(self):
+        """
+        Returns a (cohort x period) DataFrame with the sum of values
+        of each cohort in each period (e.g. revenue)
+        """
+        cells = self.cohorts * self.n_periods + self.periods
+        return self.to_frame(self.accumulate(cells, self.values))
+
+    def get_value_retention(self):
+        """
+        Returns a (cohort x period) DataFrame with the values of each
+        period relative to period 0 of the cohort (e.g. revenue retention)
+        """
+        values = self.get_values()
+        return values.div(values[0], axis=0)
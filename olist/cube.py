@@ -0,0 +1,163 @@
+import itertools
+import numpy as np
+import pandas as pd
+from olist.data import get_olist
+
+DIMENSIONS = ['customer_state', 'seller_state', 'category', 'month']
+
+# Additive partials: averages are only computed at query time
+MEASURES = [
+    'sales', 'n_items', 'order_share', 'n_reviews', 'sum_review_score',
+    'n_delivered', 'sum_wait_time', 'sum_delay_vs_expected'
+]
+
+
+class Cube:
+    """
+    Marketplace KPIs by customer_state, seller_state, category and
+    purchase month, stored as dense arrays of additive partials.
+    Any roll-up (cuboid) is a sum over axes of an already computed cuboid,
+    so slices never rescan the underlying tables.
+
+    The grain is the order item: order-level measures (reviews, wait_time,
+    delay_vs_expected) are split evenly between the items of the order.
+    `order_share` is thus an item-weighted share of orders, not a distinct
+    count: an order with 3 items, 2 of them in a category, counts 2/3 in
+    that category. It only equals the number of orders for slices on
+    dimensions shared by all items of an order (customer_state, month).
+    Averages are weighted by these shares.
+    """
+    def __init__(self, olist=None):
+        self.data = get_olist(olist).get_data()
+        self.labels, base = self.get_base_cuboid()
+        self._cuboids = {tuple(DIMENSIONS): base}
+
+    def get_facts(self):
+        """
+        Returns a DataFrame with one row per order item with the
+        dimensions and the item share of each measure
+        """
+        data = self.data
+        order_items = data['order_items'][['order_id', 'seller_id', 'product_id', 'price']]
+        orders = data['orders'][[
+            'order_id', 'customer_id', 'order_status', 'order_purchase_timestamp',
+            'order_delivered_customer_date', 'order_estimated_delivery_date'
+        ]]
+        categories = data['products'][['product_id', 'product_category_name']]\
+            .merge(data['product_category_name_translation'],
+                   on='product_category_name', how='left')
+        reviews = data['order_reviews'].groupby('order_id', as_index=False)\
+            .agg({'review_score': 'mean'})
+
+        facts = order_items\
+            .merge(orders, on='order_id')\
+            .merge(data['customers'][['customer_id', 'customer_state']], on='customer_id')\
+            .merge(data['sellers'][['seller_id', 'seller_state']], on='seller_id')\
+            .merge(categories, on='product_id', how='left')\
+            .merge(reviews, on='order_id', how='left')
+
+        facts['category'] = facts['product_category_name_english'].fillna('unknown')
+        purchase = pd.to_datetime(facts['order_purchase_timestamp'])
+        facts['month'] = purchase.dt.strftime('%Y-%m')
+
+        # Share of the order carried by each of its items
+        share = 1 / facts.groupby('order_id')['order_id'].transform('count')
+
+        delivered = pd.to_datetime(facts['order_delivered_customer_date'])
+        estimated = pd.to_datetime(facts['order_estimated_delivery_date'])
+        wait_time = (delivered - purchase) / np.timedelta64(24, 'h')
+        delay = ((delivered - estimated) / np.timedelta64(24, 'h')).clip(lower=0)
+        is_delivered = (facts['order_status'] == 'delivered') & wait_time.notna()
+        is_reviewed = facts['review_score'].notna()
+
+        facts['sales'] = facts['price']
+        facts['n_items'] = 1
+        facts['order_share'] = share
+        facts['n_reviews'] = share * is_reviewed
+        facts['sum_review_score'] = (share * facts['review_score']).where(is_reviewed, 0)
+        facts['n_delivered'] = share * is_delivered
+        facts['sum_wait_time'] = (share * wait_time).where(is_delivered, 0)
+        facts['sum_delay_vs_expected'] = (share * delay).where(is_delivered, 0)
+        return facts[DIMENSIONS + MEASURES]
+
+    def get_base_cuboid(self):
+        """
+        Returns (labels, cube) where `labels` maps each dimension to its
+        values, and `cube` has shape (n_measures, *dimension sizes)
+        """
+        facts = self.get_facts()
+        labels, codes = {}, []
+        for dim in DIMENSIONS:
+            dim_codes, labels[dim] = pd.factorize(facts[dim], sort=True)
+            codes.append(dim_codes)
+
+        shape = tuple(len(labels[dim]) for dim in DIMENSIONS)
+        cells = np.ravel_multi_index(codes, shape)
+        cube = np.stack([
+            np.bincount(cells, weights=facts[measure].to_numpy(dtype=float),
+                        minlength=int(np.prod(shape))).reshape(shape)
+            for measure in MEASURES
+        ])
+        return labels, cube
+
+    def get_cuboid(self, dims):
+        """
+        Returns the cube rolled up to `dims`, computed from the smallest
+        already materialized cuboid containing them
+        """
+        dims = tuple(dim for dim in DIMENSIONS if dim in dims)
+        if dims not in self._cuboids:
+            parent = min((key for key in self._cuboids if set(dims) <= set(key)),
+                         key=lambda key: self._cuboids[key].size)
+            axes = tuple(i + 1 for i, dim in enumerate(parent) if dim not in dims)
+            self._cuboids[dims] = self._cuboids[parent].sum(axis=axes)
+        return self._cuboids[dims]
+
+    def materialize(self):
+        """
+        Computes all cuboids of the dimension lattice upfront,
+        from the finest to the coarsest
+        """
+        for n_dims in range(len(DIMENSIONS) - 1, -1, -1):
+            for dims in itertools.combinations(DIMENSIONS, n_dims):
+                self.get_cuboid(dims)
+
+    def query(self, by=(), **filters):
+        """
+        Returns a DataFrame with `by` dimensions as index, and:
+        'sales', 'n_items', 'order_share', 'review_score', 'wait_time',
+        'delay_vs_expected' (see the class docstring for order_share)
+        filtered on dimension values, e.g. query(['month'], customer_state=['SP', 'RJ'])
+        """
+        by = [dim for dim in DIMENSIONS if dim in by]
+        dims = [dim for dim in DIMENSIONS if dim in by or dim in filters]
+        cube = self.get_cuboid(dims)
+
+        # Slice filtered dimensions, then sum those not in `by`
+        labels = dict(self.labels)
+        for axis, dim in enumerate(dims, start=1):
+            if dim in filters:
+                indexer = labels[dim].get_indexer(np.atleast_1d(filters[dim]))
+                indexer = indexer[indexer >= 0]
+                cube = np.take(cube, indexer, axis=axis)
+                labels[dim] = labels[dim][indexer]
+        axes = tuple(axis for axis, dim in enumerate(dims, start=1) if dim not in by)
+        cube = cube.sum(axis=axes)
+
+        sums = dict(zip(MEASURES, cube.reshape(len(MEASURES), -1)))
+        if by:
+            index = pd.MultiIndex.from_product([labels[dim] for dim in by], names=by)
+        else:
+            index = pd.Index(['all'])
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = pd.DataFrame({
+                'sales': sums['sales'],
+                'n_items': sums['n_items'],
+                'order_share': sums['order_share'],
+                'review_score': sums['sum_review_score'] / sums['n_reviews'],
+                'wait_time': sums['sum_wait_time'] / sums['n_delivered'],
+                'delay_vs_expected': sums['sum_delay_vs_expected'] / sums['n_delivered']
+            }, index=index)
+        # Only keep non-empty cells
+        return result[result['n_items'] > 0]
@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+from olist.data import get_olist
+from olist.order import Order
+from olist.lifecycle import NS_PER_DAY
+from olist.cohort import Cohort
+
+
+class Customer:
+    '''
+    DataFrames containing all customers (customer_unique_id) as index,
+    and their purchase history as columns. customer_id is per order:
+    customer_unique_id identifies the same customer across orders.
+    '''
+    def __init__(self, olist=None):
+        self.olist = get_olist(olist)
+        self.data = self.olist.get_data()
+        self.order = Order(self.olist)
+        self._purchases = None
+
+    def get_purchases(self):
+        """
+        Returns a DataFrame with one row per purchase (canceled and
+        unavailable orders excluded), sorted once by customer then time:
+        'customer_unique_id', 'order_id', 'order_purchase_timestamp',
+        'purchase_rank', 'days_since_previous_purchase', 'order_value'
+        (price + freight_value of the order items)
+        """
+        if self._purchases is not None:
+            return self._purchases
+
+        lifecycle = self.order.get_lifecycle()
+        orders = self.data['orders']
+        customers = self.data['customers']
+
+        # customer_unique_id of each order, and value of each order
+        positions = pd.Index(customers['customer_id']).get_indexer(orders['customer_id'])
+        unique_ids = np.where(positions >= 0,
+                              customers['customer_unique_id'].to_numpy()[positions],
+                              None)
+        order_items = self.data['order_items']
+        item_orders = lifecycle.order_ids.get_indexer(order_items['order_id'])
+        known = item_orders >= 0
+        values = np.bincount(
+            item_orders[known],
+            weights=(order_items['price'] + order_items['freight_value']).to_numpy()[known],
+            minlength=len(orders))
+
+        kept = np.flatnonzero(
+            (positions >= 0) & ~lifecycle.missing['purchase'] &
+            ~np.isin(lifecycle.order_status, ['canceled', 'unavailable']))
+
+        # Sort once: the purchases of each customer are a contiguous segment
+        codes, uniques = pd.factorize(unique_ids[kept], sort=True)
+        epochs = lifecycle.epochs['purchase'][kept]
+        order = np.lexsort((epochs, codes))
+        kept, codes, epochs = kept[order], codes[order], epochs[order]
+
+        starts = np.r_[True, codes[1:] != codes[:-1]]
+        segment_starts = np.flatnonzero(starts)
+        rank = np.arange(len(codes)) - np.repeat(segment_starts, np.diff(
+            np.r_[segment_starts, len(codes)])) + 1
+        gaps = np.r_[np.nan, np.diff(epochs) / NS_PER_DAY]
+        gaps[starts] = np.nan
+
+        self._purchases = pd.DataFrame({
+            'customer_unique_id': uniques[codes],
+            'order_id': lifecycle.order_ids[kept],
+            'order_purchase_timestamp': epochs.view('datetime64[ns]'),
+            'purchase_rank': rank,
+            'days_since_previous_purchase': gaps,
+            'order_value': values[kept]
+        })
+        return self._purchases
+
+    def get_rfm(self, reference_date=None):
+        """
+        Returns a DataFrame with:
+        'customer_unique_id', 'recency', 'frequency', 'monetary'
+        recency is in days before `reference_date` (default: the last
+        purchase in the data)
+        """
+        purchases = self.get_purchases()
+        customers = purchases['customer_unique_id'].to_numpy()
+        starts = np.flatnonzero(np.r_[True, customers[1:] != customers[:-1]])
+        ends = np.r_[starts[1:], len(customers)]
+
+        epochs = purchases['order_purchase_timestamp'].to_numpy().view('int64')
+        if reference_date is None:
+            reference = epochs.max()
+        else:
+            reference = pd.Timestamp(reference_date).value
+
+        return pd.DataFrame({
+            'customer_unique_id': customers[starts],
+            'recency': (reference - epochs[ends - 1]) / NS_PER_DAY,
+            'frequency': ends - starts,
+            'monetary': np.add.reduceat(purchases['order_value'].to_numpy(), starts)
+        })
+
+    def get_repeat_purchases(self):
+        """
+        Returns a DataFrame with:
+        'customer_unique_id', 'is_repeat_customer', 'days_to_second_purchase',
+        'mean_days_between_purchases', 'max_days_between_purchases'
+        (NaN for customers with a single purchase)
+        """
+        purchases = self.get_purchases()
+        customers = purchases['customer_unique_id'].to_numpy()
+        starts = np.flatnonzero(np.r_[True, customers[1:] != customers[:-1]])
+        n_purchases = np.diff(np.r_[starts, len(customers)])
+
+        # Gaps are NaN on the first purchase of each segment
+        gaps = purchases['days_since_previous_purchase'].to_numpy()
+        filled = np.nan_to_num(gaps)
+        repeat = n_purchases > 1
+        second = np.where(repeat, starts + 1, starts)
+
+        with np.errstate(invalid='ignore'):
+            mean_gaps = np.add.reduceat(filled, starts) / (n_purchases - 1)
+        max_gaps = np.maximum.reduceat(np.where(np.isnan(gaps), -np.inf, gaps), starts)
+
+        return pd.DataFrame({
+            'customer_unique_id': customers[starts],
+            'is_repeat_customer': repeat.astype(int),
+            'days_to_second_purchase': np.where(repeat, gaps[second], np.nan),
+            'mean_days_between_purchases': np.where(repeat, mean_gaps, np.nan),
+            'max_days_between_purchases': np.where(repeat, max_gaps, np.nan)
+        })
+
+    def get_cohorts(self):
+        """
+        Returns the Cohort of customers by month of first purchase, with
+        order values as values: see olist/cohort.py
+        """
+        purchases = self.get_purchases()
+        return Cohort(purchases['customer_unique_id'],
+                      purchases['order_purchase_timestamp'], purchases['order_value'])
+
+    def get_customer_features(self):
+        """
+        Returns a DataFrame with:
+        'customer_unique_id', 'customer_city', 'customer_state'
+        (location of the customer's last purchase)
+        """
+        purchases = self.get_purchases()
+        last = purchases.drop_duplicates('customer_unique_id', keep='last')
+        customer_ids = self.data['orders'].set_index('order_id')['customer_id']\
+            .reindex(last['order_id']).to_numpy()
+        locations = self.data['customers'].set_index('customer_id')[[
+            'customer_city', 'customer_state'
+        ]].reindex(customer_ids)
+        return pd.DataFrame({
+            'customer_unique_id': last['customer_unique_id'].to_numpy(),
+            'customer_city': locations['customer_city'].to_numpy(),
+            'customer_state': locations['customer_state'].to_numpy()
+        })
+
+    def get_training_data(self, reference_date=None):
+        """
+        Returns a DataFrame with:
+        'customer_unique_id', 'customer_city', 'customer_state', 'recency',
+        'frequency', 'monetary', 'is_repeat_customer', 'days_to_second_purchase',
+        'mean_days_between_purchases', 'max_days_between_purchases'
+        """
+        # All methods return customers in the same (sorted) order
+        features = [self.get_customer_features(),
+                    self.get_rfm(reference_date),
+                    self.get_repeat_purchases()]
+        return pd.concat([features[0]] +
+                         [df.drop(columns='customer_unique_id') for df in features[1:]],
+                         axis=1)
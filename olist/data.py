@@ -1,22 +1,115 @@
+import contextlib
 import os
+import numpy as np
 import pandas as pd
 
+# All Olist timestamps share this format
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+TIMESTAMP_COLUMNS = [
+    'order_purchase_timestamp', 'order_approved_at', 'order_delivered_carrier_date',
+    'order_delivered_customer_date', 'order_estimated_delivery_date',
+    'shipping_limit_date', 'review_creation_date', 'review_answer_timestamp'
+]
+
+# Parsed csv files, keyed by path: ((size, modification time), DataFrame)
+_tables = {}
+
+# Samples already drawn, keyed by (snapshot, sample, stratify_by, seed)
+_samples = {}
+
+
+def parse_timestamps(df):
+    """
+    Converts the TIMESTAMP_COLUMNS of `df` (strings in TIMESTAMP_FORMAT,
+    NaN when not filled yet) to datetime64, in place (missing values are NaT).
+    Any non-datetime dtype is parsed: object, but also the pandas string dtype
+    (future.infer_string, default in pandas 3) or float for empty columns
+    """
+    for column in df.columns.intersection(TIMESTAMP_COLUMNS):
+        if not pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = pd.to_datetime(df[column], format=TIMESTAMP_FORMAT)
+    return df
+
+
+def read_csv(path, deep=True):
+    """
+    Returns the DataFrame of the csv file at `path` with parsed timestamps.
+    Files are read and parsed once, then copied until they change on disk
+    (shallow copies if not `deep`: only safe with copy-on-write enabled)
+    """
+    stat = os.stat(path)
+    version = (stat.st_size, stat.st_mtime_ns)
+    if path not in _tables or _tables[path][0] != version:
+        _tables[path] = (version, parse_timestamps(pd.read_csv(path)))
+    # Copies, as some methods add columns to the DataFrames they get
+    return _tables[path][1].copy(deep=deep)
+
+
+def is_copy_on_write():
+    """
+    Returns True if pandas copy-on-write is enabled (pandas >= 1.5):
+    shallow copies then never share modifications
+    """
+    try:
+        return pd.get_option('mode.copy_on_write') is True
+    except KeyError:
+        return False
+
+
+@contextlib.contextmanager
+def copy_on_write():
+    """
+    Enables pandas copy-on-write inside a `with` block only, restoring
+    the previous setting on exit (does nothing if not supported)
+    """
+    try:
+        previous = pd.get_option('mode.copy_on_write')
+    except KeyError:
+        yield
+        return
+    pd.set_option('mode.copy_on_write', True)
+    try:
+        yield
+    finally:
+        pd.set_option('mode.copy_on_write', previous)
+
+
+def get_olist(olist=None):
+    """
+    Returns `olist`, or a new Olist() on the full data if None.
+    Feature classes take an optional Olist through this helper, so that
+    e.g. Order(Olist(sample=0.05)) works on a sample
+    """
+    return olist if olist is not None else Olist()
+
 
 class Olist:
+    def __init__(self, sample=None, stratify_by=None, seed=0, lean=False):
+        # Optional sampling mode, e.g. Olist(sample=0.05, stratify_by="customer_state")
+        self.sample = sample
+        self.stratify_by = stratify_by
+        self.seed = seed
+        # Lean mode: shallow copies of the tables while copy-on-write is enabled
+        # (e.g. inside `with copy_on_write():`), deep copies otherwise
+        self.lean = lean
+
     def get_data(self):
         """
         This function returns a Python dict.
         Its keys should be 'sellers', 'orders', 'order_items' etc...
         Its values should be pandas.DataFrames loaded from csv files
         """
+        if self.sample is not None:
+            return self.get_sample()
+
         # Hints 1: Build csv_path as "absolute path" in order to call this method from anywhere.
             # Do not hardcode your path as it only works on your machine ('Users/username/code...')
             # Use __file__ instead as an absolute path anchor independant of your usename
             # Make extensive use of `breakpoint()` to investigate what `__file__` variable is really
         # Hint 2: Use os.path library to construct path independent of Mac vs. Unix vs. Windows specificities
         # $CHALLENGIFY_BEGIN
-        root_dir = os.path.dirname(os.path.dirname(__file__))
-        csv_path = os.path.join(root_dir, "data", "csv")
+        csv_path = self.get_csv_path()
 
         file_names = [f for f in os.listdir(csv_path) if f.endswith(".csv")]
 
@@ -28,10 +121,129 @@ class Olist:
         # Create the dictionary
         data = {}
         for k, f in zip(key_names, file_names):
-            data[k] = pd.read_csv(os.path.join(csv_path, f))
+            data[k] = read_csv(os.path.join(csv_path, f), deep=not self.is_lean())
         return data
         # $CHALLENGIFY_END
 
+    def is_lean(self):
+        """
+        Returns True if tables can be handed out as shallow copies:
+        lean mode with copy-on-write currently enabled
+        """
+        return self.lean and is_copy_on_write()
+
+    def _draw_sample(self):
+        """
+        Returns (data, strata, population): a sample of orders with only
+        their related rows, the stratum of each sampled order_id, and the
+        number of orders per stratum in the full data
+        """
+        data = Olist(lean=self.lean).get_data()
+        orders = data['orders']
+
+        # Stratum of each order: a column of orders or customers
+        if self.stratify_by is None:
+            strata = pd.Series('all', index=orders.index)
+        elif self.stratify_by in orders.columns:
+            strata = orders[self.stratify_by]
+        else:
+            strata = orders[['customer_id']].merge(
+                data['customers'][['customer_id', self.stratify_by]],
+                on='customer_id', how='left')[self.stratify_by]
+            strata.index = orders.index
+        strata = strata.fillna('unknown')
+
+        sampled = orders.groupby(strata.values, group_keys=False)\
+            .sample(frac=self.sample, random_state=self.seed)
+        order_ids = sampled['order_id']
+
+        # Only keep rows related to sampled orders (referential consistency)
+        sample = dict(data)
+        sample['orders'] = sampled.sort_index()
+        for name in ['order_items', 'order_reviews', 'order_payments']:
+            sample[name] = data[name][data[name]['order_id'].isin(order_ids)]
+        sample['customers'] = data['customers'][
+            data['customers']['customer_id'].isin(sampled['customer_id'])]
+        sample['sellers'] = data['sellers'][
+            data['sellers']['seller_id'].isin(sample['order_items']['seller_id'])]
+        sample['products'] = data['products'][
+            data['products']['product_id'].isin(sample['order_items']['product_id'])]
+
+        strata_sampled = pd.Series(strata[sampled.index].values, index=order_ids.values)
+        population = strata.value_counts()
+        return sample, strata_sampled, population
+
+    def get_sample(self):
+        """
+        Returns the same dict as `get_data`, restricted to a (stratified)
+        sample of orders, drawn once per seed and cached
+        """
+        key = (self.get_snapshot(), self.sample, self.stratify_by, self.seed)
+        if key not in _samples:
+            _samples[key] = self._draw_sample()
+        sample, self.strata, self.population = _samples[key]
+        # Copies, as some methods add columns to self.data
+        return {name: df.copy(deep=not self.is_lean()) for name, df in sample.items()}
+
+    def get_sampling_error(self, df, column, key='order_id'):
+        """
+        Returns a Series with 'mean', 'standard_error', 'n' of `column`
+        in `df` (e.g. Order().get_training_data() on a sample).
+        Rows must be sampled orders keyed by order_id, possibly a subdomain
+        of them (e.g. delivered orders): the domain size of each stratum is
+        estimated from the sample, and the variance is that of the ratio
+        estimator (linearized). Raises a ValueError for other keys, as the
+        sample draws orders and not e.g. sellers
+        """
+        values = df[[key, column]].dropna()
+        if self.sample is None:
+            return pd.Series({'mean': values[column].mean(), 'standard_error': 0,
+                              'n': len(values)})
+        if key != 'order_id':
+            raise ValueError(f"sampling errors need one row per sampled order (key='order_id'): "
+                             f"the sample draws orders, not {key} values")
+        self.get_sample()
+
+        # Sampled (n_h) and total (N_h) orders per stratum, and weight N_h / n_h of each row
+        n_sampled = self.strata.value_counts()
+        n_total = self.population.reindex(n_sampled.index)
+        strata = values[key].map(self.strata)
+        weights = strata.map(n_total / n_sampled).to_numpy(dtype=float)
+        y = values[column].to_numpy(dtype=float)
+        domain_size = weights.sum()
+        mean = (weights * y).sum() / domain_size
+
+        # Linearized residuals, 0 for the sampled orders outside the domain
+        residuals = pd.DataFrame({'z': y - mean, 'z2': (y - mean) ** 2})\
+            .groupby(strata.to_numpy()).sum().reindex(n_sampled.index, fill_value=0)
+        sums, squares = residuals['z'], residuals['z2']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s2 = ((squares - sums ** 2 / n_sampled) / (n_sampled - 1)).fillna(0)
+        variance = (n_total ** 2 * (1 - n_sampled / n_total) * s2 / n_sampled).sum() /\
+            domain_size ** 2
+        return pd.Series({'mean': mean, 'standard_error': variance ** 0.5,
+                          'n': len(values)})
+
+    def get_csv_path(self):
+        """
+        Returns the absolute path of the folder containing the csv files
+        """
+        root_dir = os.path.dirname(os.path.dirname(__file__))
+        return os.path.join(root_dir, "data", "csv")
+
+    def get_snapshot(self):
+        """
+        Returns a tuple of (file name, size, modification time) for each
+        csv file: it changes whenever the data is updated
+        """
+        csv_path = self.get_csv_path()
+        snapshot = []
+        for f in sorted(os.listdir(csv_path)):
+            if f.endswith(".csv"):
+                stat = os.stat(os.path.join(csv_path, f))
+                snapshot.append((f, stat.st_size, stat.st_mtime_ns))
+        return tuple(snapshot)
+
     def ping(self):
         """
         You call ping I print pong.
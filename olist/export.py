@@ -0,0 +1,114 @@
+"""
+Export of the training sets as Hive-partitioned Parquet datasets
+(e.g. orders/purchase_month=2018-01/customer_state=SP/*.parquet),
+and a reader loading only the requested partitions and rows.
+
+    from olist.export import export, read
+    export('orders')
+    read('orders', filters=[('purchase_month', '>=', '2018-01'),
+                            ('customer_state', 'in', ['SP', 'RJ'])])
+"""
+import os
+import shutil
+import tempfile
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from olist.data import Olist, get_olist
+
+# Partition columns of each training set
+PARTITIONS = {
+    'orders': ['purchase_month', 'customer_state'],
+    'sellers': ['first_sale_month', 'seller_state'],
+    'products': ['category']
+}
+
+
+def get_training_data(name, olist=None):
+    """
+    Returns the training set `name` ('orders', 'sellers' or 'products')
+    with its partition columns
+    """
+    olist = get_olist(olist)
+    if name == 'orders':
+        from olist.order import Order
+        order = Order(olist)
+        df = order.get_training_data(with_distance_seller_customer=True)
+        # Purchase month and customer state of each order
+        orders = order.data['orders'].set_index('order_id')
+        customers = order.data['customers'].set_index('customer_id')
+        purchase = orders['order_purchase_timestamp'].reindex(df['order_id'])
+        df['purchase_month'] = purchase.dt.strftime('%Y-%m').to_numpy()
+        df['customer_state'] = customers['customer_state']\
+            .reindex(orders['customer_id'].reindex(df['order_id'])).to_numpy()
+    elif name == 'sellers':
+        from olist.seller import Seller
+        df = Seller(olist).get_training_data()
+        df['first_sale_month'] = df['date_first_sale'].dt.strftime('%Y-%m')
+    else:
+        from olist.product import Product
+        df = Product(olist).get_training_data()
+    return df
+
+
+def get_path(name):
+    """
+    Returns the default folder of dataset `name`: data/parquet/<name>
+    """
+    return os.path.join(os.path.dirname(Olist().get_csv_path()), 'parquet', name)
+
+
+def get_partitioning(name):
+    # Partition values are always read back as strings (no type inference)
+    return ds.partitioning(pa.schema([(column, pa.string()) for column in PARTITIONS[name]]),
+                           flavor='hive')
+
+
+def export(name, path=None, olist=None, row_group_size=100000):
+    """
+    Writes the training set `name` as a Parquet dataset partitioned by
+    PARTITIONS[name] (with min/max statistics per row group) and
+    returns its path. The folder at `path` is replaced as a whole, so
+    that partitions of values no longer in the data are not read back
+    """
+    path = os.path.abspath(path or get_path(name))
+    df = get_training_data(name, olist)
+    # Missing partition values get their own partition
+    df[PARTITIONS[name]] = df[PARTITIONS[name]].fillna('unknown')
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    # Written in a staging folder next to `path`, then swapped in
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f".{name}_", dir=parent)
+    try:
+        ds.write_dataset(table, os.path.join(staging, 'new'), format='parquet',
+                         partitioning=get_partitioning(name),
+                         max_rows_per_group=row_group_size,
+                         file_options=ds.ParquetFileFormat().make_write_options(
+                             write_statistics=True))
+        if os.path.exists(path):
+            os.rename(path, os.path.join(staging, 'old'))
+        os.rename(os.path.join(staging, 'new'), path)
+    finally:
+        shutil.rmtree(staging)
+    return path
+
+
+def read(name, path=None, columns=None, filters=None):
+    """
+    Returns the DataFrame of the rows of dataset `name` matching
+    `filters`, e.g. [('customer_state', 'in', ['SP', 'RJ']),
+    ('wait_time', '>', 10)] (combined with AND, or a list of such
+    lists combined with OR). Filters on partition columns skip whole
+    folders, others skip row groups using their statistics
+    """
+    path = path or get_path(name)
+    table = pq.read_table(path, columns=columns, filters=filters,
+                          partitioning=get_partitioning(name))
+    df = table.to_pandas()
+    # Partition columns are read as categoricals
+    for column in PARTITIONS[name]:
+        if column in df.columns:
+            df[column] = df[column].astype(object)
+    return df
@@ -0,0 +1,117 @@
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+from olist.data import get_olist
+from olist.utils import haversine_distances
+
+# Bounding box of Brazil (lat_min, lat_max, lng_min, lng_max)
+BRAZIL_BOUNDS = (-33.75, 5.27, -73.99, -34.79)
+
+# Part of the disk cache key: bump it when the cleaning method changes
+CACHE_VERSION = 1
+
+
+class Geolocation:
+    """
+    Cleaned coordinates of zip code prefixes. Raw geolocation rows are
+    binned to a grid of `cell_size` degrees: the densest cell of each
+    prefix is its anchor, points outside Brazil or farther than
+    `max_distance_km` from the anchor are rejected, and the centroid of
+    the remaining points is the location of the prefix.
+    The result is cached on disk until the csv files change.
+    """
+    def __init__(self, olist=None, cell_size=0.1, max_distance_km=50, cache_dir=None):
+        self.olist = get_olist(olist)
+        self.cell_size = cell_size
+        self.max_distance_km = max_distance_km
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(self.olist.get_csv_path()), 'cache')
+        self.cache_dir = cache_dir
+        self._locations = None
+
+    def get_cache_key(self):
+        """
+        Returns a tuple identifying the cleaned locations: cleaning version
+        and parameters, data snapshot and sample
+        """
+        return (CACHE_VERSION, BRAZIL_BOUNDS, self.cell_size, self.max_distance_km,
+                self.olist.get_snapshot(), self.olist.sample, self.olist.stratify_by,
+                self.olist.seed)
+
+    def _get_cache_path(self):
+        digest = hashlib.sha1(repr(self.get_cache_key()).encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"geolocation_{digest}.pkl")
+
+    def clean(self, geo):
+        """
+        Returns a DataFrame with:
+        'geolocation_zip_code_prefix', 'geolocation_lat', 'geolocation_lng',
+        'n_points', 'n_rejected'
+        from the raw `geo` table (one row per prefix with at least one valid point)
+        """
+        lat_min, lat_max, lng_min, lng_max = BRAZIL_BOUNDS
+        lat = geo['geolocation_lat'].to_numpy(dtype=float)
+        lng = geo['geolocation_lng'].to_numpy(dtype=float)
+        codes, prefixes = pd.factorize(geo['geolocation_zip_code_prefix'], sort=True)
+        with np.errstate(invalid='ignore'):
+            valid = (lat >= lat_min) & (lat <= lat_max) & (lng >= lng_min) &\
+                (lng <= lng_max) & (codes >= 0)
+
+        # Grid cell of each valid point, and number of points per (prefix, cell)
+        n_cols = int(np.ceil((lng_max - lng_min) / self.cell_size)) + 1
+        n_cells = (int(np.ceil((lat_max - lat_min) / self.cell_size)) + 1) * n_cols
+        cells = np.floor((lat[valid] - lat_min) / self.cell_size).astype(np.int64) * n_cols +\
+            np.floor((lng[valid] - lng_min) / self.cell_size).astype(np.int64)
+        pairs, counts = np.unique(codes[valid].astype(np.int64) * n_cells + cells,
+                                  return_counts=True)
+
+        # Anchor: densest cell of each prefix (first of them in case of ties)
+        pair_codes = pairs // n_cells
+        order = np.lexsort((-counts, pair_codes))
+        first = np.r_[True, pair_codes[order][1:] != pair_codes[order][:-1]]
+        anchors = np.full(len(prefixes), -1, dtype=np.int64)
+        anchors[pair_codes[order][first]] = pairs[order][first] % n_cells
+        anchor_lat = lat_min + (anchors // n_cols + 0.5) * self.cell_size
+        anchor_lng = lng_min + (anchors % n_cols + 0.5) * self.cell_size
+
+        # Reject points far from their anchor, then average the others
+        distances = np.full(len(lat), np.inf)
+        distances[valid] = haversine_distances(lng[valid], lat[valid],
+                                               anchor_lng[codes[valid]],
+                                               anchor_lat[codes[valid]])
+        kept = distances <= self.max_distance_km
+        n_kept = np.bincount(codes[kept], minlength=len(prefixes))
+        located = n_kept > 0
+        with np.errstate(invalid='ignore'):
+            centroid_lat = np.bincount(codes[kept], weights=lat[kept],
+                                       minlength=len(prefixes)) / n_kept
+            centroid_lng = np.bincount(codes[kept], weights=lng[kept],
+                                       minlength=len(prefixes)) / n_kept
+
+        n_points = np.bincount(codes[codes >= 0], minlength=len(prefixes))
+        return pd.DataFrame({
+            'geolocation_zip_code_prefix': prefixes[located],
+            'geolocation_lat': centroid_lat[located],
+            'geolocation_lng': centroid_lng[located],
+            'n_points': n_points[located],
+            'n_rejected': (n_points - n_kept)[located]
+        })
+
+    def get_locations(self):
+        """
+        Returns the cleaned DataFrame of `clean` for the geolocation table,
+        computed once and cached on disk
+        """
+        if self._locations is not None:
+            return self._locations
+
+        path = self._get_cache_path()
+        if os.path.exists(path):
+            self._locations = pd.read_pickle(path)
+            return self._locations
+
+        self._locations = self.clean(self.olist.get_data()['geolocation'])
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._locations.to_pickle(path)
+        return self._locations
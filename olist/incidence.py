@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from olist.data import get_olist
+
+
+class Incidence:
+    """
+    Sparse (seller x order) or (product x order) incidence matrices of
+    order_items, built once. Aggregates per seller or product are then
+    sparse matrix-vector products against per-order vectors, which makes
+    repeated what-if recomputations cheap.
+    """
+    def __init__(self, key='seller_id', olist=None):
+        # key can be 'seller_id' or 'product_id'
+        self.key = key
+        self.data = get_olist(olist).get_data()
+        self.keys, self.order_ids, self.items, self.prices = self.get_matrices()
+        # Orders with at least one item of the key
+        self.orders = (self.items > 0).astype(float)
+        self.review_counts = self.get_order_review_counts()
+
+    def get_matrices(self):
+        """
+        Returns (keys, order_ids, items, prices) where `items` and `prices`
+        are CSR matrices of shape (n_keys, n_orders) holding the number
+        of items and the total price of each key in each order
+        """
+        order_items = self.data['order_items']
+        key_codes, keys = pd.factorize(order_items[self.key], sort=True)
+        order_codes, order_ids = pd.factorize(order_items['order_id'], sort=True)
+        shape = (len(keys), len(order_ids))
+
+        # Duplicate (key, order) entries are summed on conversion to CSR
+        items = sparse.coo_matrix(
+            (np.ones(len(order_items)), (key_codes, order_codes)), shape=shape).tocsr()
+        prices = sparse.coo_matrix(
+            (order_items['price'].to_numpy(dtype=float), (key_codes, order_codes)),
+            shape=shape).tocsr()
+        return keys, order_ids, items, prices
+
+    def get_order_review_counts(self):
+        """
+        Returns a (n_orders, 5) array with the number of reviews
+        of 1 to 5 stars of each order
+        """
+        reviews = self.data['order_reviews'][['order_id', 'review_score']]
+        order_codes = self.order_ids.get_indexer(reviews['order_id'])
+        known = order_codes >= 0
+        counts = np.zeros((len(self.order_ids), 5))
+        np.add.at(counts,
+                  (order_codes[known],
+                   reviews['review_score'].to_numpy()[known].astype(int) - 1),
+                  1)
+        return counts
+
+    def aggregate(self, order_values, by_items=False):
+        """
+        Returns the sum of per-order `order_values` (array of length
+        n_orders, or (n_orders, k)) over the orders of each key, weighted
+        by the number of items of the key in the order if `by_items`
+        """
+        matrix = self.items if by_items else self.orders
+        return matrix @ order_values
+
+    def get_quantity(self):
+        """
+        Returns a DataFrame with:
+        key, 'n_orders', 'quantity', 'quantity_per_order'
+        """
+        ones = np.ones(len(self.order_ids))
+        result = pd.DataFrame({
+            self.key: self.keys,
+            'n_orders': self.aggregate(ones).astype(int),
+            'quantity': self.aggregate(ones, by_items=True).astype(int)
+        })
+        result['quantity_per_order'] = result['quantity'] / result['n_orders']
+        return result
+
+    def get_sales(self):
+        """
+        Returns a DataFrame with:
+        key, 'sales'
+        """
+        sales = self.prices @ np.ones(len(self.order_ids))
+        return pd.DataFrame({self.key: self.keys, 'sales': sales})
+
+    def get_review_score(self, by_items=None):
+        """
+        Returns a DataFrame with:
+        key, 'share_of_five_stars', 'share_of_one_stars', 'review_score'
+        By default, reviews are weighted by items for sellers (as in
+        Seller.get_review_score) and counted once per order for products
+        (as in Product.get_review_score)
+        """
+        if by_items is None:
+            by_items = self.key == 'seller_id'
+        counts = self.aggregate(self.review_counts, by_items)
+        n_reviews = counts.sum(axis=1)
+        reviewed = n_reviews > 0
+        counts, n_reviews = counts[reviewed], n_reviews[reviewed]
+
+        return pd.DataFrame({
+            self.key: self.keys[reviewed],
+            'share_of_five_stars': counts[:, 4] / n_reviews,
+            'share_of_one_stars': counts[:, 0] / n_reviews,
+            'review_score': counts @ np.arange(1, 6) / n_reviews
+        })
+
+    def get_review_cost(self, review_costs=(100, 50, 40, 0, 0)):
+        """
+        Returns a DataFrame with:
+        key, 'review_cost'
+        given the cost of a review of 1 to 5 stars, weighted by items
+        as in Seller.get_revenue_cost
+        """
+        order_costs = self.review_counts @ np.asarray(review_costs, dtype=float)
+        return pd.DataFrame({
+            self.key: self.keys,
+            'review_cost': self.aggregate(order_costs, by_items=True)
+        })
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+
+def get_keys(df, key):
+    """
+    Returns the array of `key` values of `df`, from a column or the index
+    (some feature methods return their key as index)
+    """
+    if key in df.columns:
+        return df[key].to_numpy()
+    return df.index.get_level_values(key).to_numpy()
+
+
+class KeyIndex:
+    """
+    Rows of a DataFrame sorted by `key` (a column or index level) and
+    stored as NumPy arrays, so that the rows of one key are a contiguous
+    slice, without scanning the table. Keys are hashed once to int64 codes
+    (pd.factorize): rows are sorted by code, and looked-up keys are hashed
+    to codes (pd.Index.get_indexer), so that keys (often object strings)
+    are never compared or sorted. Rows of the same key keep their order
+    (stable sort), as in merge; missing keys match each other, as in merge.
+    """
+    def __init__(self, df, key, columns=None):
+        if columns is None:
+            columns = [column for column in df.columns if column != key]
+        codes, uniques = pd.factorize(get_keys(df, key), use_na_sentinel=False)
+        # Distinct keys: the code of a key is its position
+        self.uniques = pd.Index(uniques)
+        # Row number in df of each indexed row
+        self.rows = np.argsort(codes, kind='stable')
+        # Rows of code c are at positions starts[c]:starts[c + 1]
+        self.starts = np.zeros(len(uniques) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(uniques)), out=self.starts[1:])
+        self.columns = {column: df[column].to_numpy()[self.rows] for column in columns}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get_codes(self, keys):
+        """
+        Returns the int64 code of each of `keys`, or -1 for unknown keys
+        """
+        return self.uniques.get_indexer(pd.Index(keys, tupleize_cols=False))
+
+    def get(self, key):
+        """
+        Returns a dict {column: array} with the rows of `key`
+        (arrays are views on the index, do not modify them)
+        """
+        code = self.get_codes([key])[0]
+        start, end = (self.starts[code], self.starts[code + 1]) if code >= 0 else (0, 0)
+        return {column: values[start:end] for column, values in self.columns.items()}
+
+    def find(self, keys):
+        """
+        Returns the position of the first row of each of `keys`,
+        or -1 for unknown keys
+        """
+        codes = self.get_codes(keys)
+        return np.where(codes >= 0, self.starts[codes], -1)
+
+    def lookup(self, keys):
+        """
+        Returns the row number in the indexed DataFrame of the first row
+        of each of `keys`, or -1 for unknown keys
+        """
+        # Position -1 (unknown) picks the appended -1
+        return np.append(self.rows, -1)[self.find(keys)]
+
+    def find_all(self, keys):
+        """
+        Returns (owners, positions): the positions of all the rows of each
+        of `keys`, in order; `owners` gives the index in `keys` of each row
+        """
+        return self.find_all_codes(self.get_codes(keys))
+
+    def find_all_codes(self, codes):
+        """
+        Same as `find_all` on keys already converted by `get_codes`
+        """
+        starts = self.starts[codes]
+        lengths = np.where(codes >= 0, self.starts[codes + 1] - starts, 0)
+        owners = np.repeat(np.arange(len(codes)), lengths)
+        # Position of each row: start of its key + its rank among the rows of the key
+        ends = np.cumsum(lengths)
+        positions = np.repeat(starts - ends + lengths, lengths)
+        positions += np.arange(len(positions))
+        return owners, positions
+
+    def get_many(self, keys):
+        """
+        Returns (positions, dict {column: array}) with all the rows of each
+        of `keys`, in order; `positions` gives the index in `keys` of each row
+        """
+        owners, positions = self.find_all(keys)
+        return owners, {column: values[positions] for column, values in self.columns.items()}
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+from olist.index import KeyIndex, get_keys
+
+
+def join_frames(frames, on):
+    """
+    Returns the inner join of `frames` on the key `on`, equal to
+    frames[0].merge(frames[1], on=on).merge(frames[2], on=on)...
+    Only row numbers are joined, through the KeyIndex of each frame, with
+    keys factorized to int64 codes: each column is taken once at the end. Raises a
+    ValueError if frames share other columns than `on`
+    """
+    columns = [column for frame in frames for column in frame.columns if column != on]
+    duplicates = sorted({column for column in columns if columns.count(column) > 1})
+    if duplicates:
+        raise ValueError(f"columns {duplicates} are in several frames: rename them "
+                         f"before joining on {on}")
+
+    # Keys of frames[0] are hashed once; each index only converts the distinct ones
+    codes, keys = pd.factorize(get_keys(frames[0], on), use_na_sentinel=False)
+    rows = [np.arange(len(frames[0]))]
+    for frame in frames[1:]:
+        index = KeyIndex(frame, on, columns=[])
+        left, positions = index.find_all_codes(index.get_codes(keys)[codes])
+        rows = [frame_rows[left] for frame_rows in rows] + [index.rows[positions]]
+        codes = codes[left]
+
+    result = {on: keys[codes]}
+    del codes
+    for frame in frames:
+        frame_rows = rows.pop(0)
+        for column in frame.columns:
+            if column != on:
+                result[column] = frame[column].to_numpy()[frame_rows]
+    # The columns are new arrays: no copy (nor consolidation) is needed
+    return pd.DataFrame(result, copy=False)
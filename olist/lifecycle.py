@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+NS_PER_DAY = 24 * 3600 * 10**9
+
+TIMESTAMPS = {
+    'purchase': 'order_purchase_timestamp',
+    'approved': 'order_approved_at',
+    'carrier': 'order_delivered_carrier_date',
+    'delivered': 'order_delivered_customer_date',
+    'estimated': 'order_estimated_delivery_date'
+}
+
+# Stage durations (in days) as (start, end) timestamps
+STAGES = {
+    'approval_latency': ('purchase', 'approved'),
+    'handling_time': ('approved', 'carrier'),
+    'carrier_transit': ('carrier', 'delivered'),
+    'wait_time': ('purchase', 'delivered'),
+    'expected_wait_time': ('purchase', 'estimated'),
+    'delay_vs_expected': ('estimated', 'delivered')
+}
+
+
+def to_epoch(series):
+    """
+    Returns (epochs, missing): int64 nanoseconds since epoch, and a
+    boolean mask of missing timestamps
+    """
+    timestamps = pd.to_datetime(series)
+    epochs = timestamps.to_numpy(dtype='datetime64[ns]').view('int64')
+    return epochs, timestamps.isna().to_numpy()
+
+
+def to_days(epochs, missing):
+    """
+    Returns the float array of days since epoch of `epochs` (as returned
+    by to_epoch), NaN where `missing`
+    """
+    days = epochs / NS_PER_DAY
+    days[missing] = np.nan
+    return days
+
+
+class Lifecycle:
+    """
+    Order lifecycle: the five timestamps of each order parsed once into
+    int64 epoch arrays, from which every stage duration is a vectorized
+    difference. Shared by Order, Seller and the other feature builders.
+    """
+    def __init__(self, data):
+        orders = data['orders']
+        self.order_ids = pd.Index(orders['order_id'])
+        self.order_status = orders['order_status'].to_numpy()
+        self.epochs, self.missing = {}, {}
+        for name, column in TIMESTAMPS.items():
+            self.epochs[name], self.missing[name] = to_epoch(orders[column])
+
+    def get_duration(self, start, end, positions=None):
+        """
+        Returns the float array of days between timestamps `start` and `end`
+        (names of TIMESTAMPS), NaN when one of them is missing, for all
+        orders or for the orders at `positions`
+        """
+        select = slice(None) if positions is None else positions
+        days = (self.epochs[end][select] - self.epochs[start][select]) / NS_PER_DAY
+        days[self.missing[start][select] | self.missing[end][select]] = np.nan
+        return days
+
+    def get_days(self, name):
+        """
+        Returns the float array of days since epoch of timestamp `name`,
+        NaN when missing
+        """
+        return to_days(self.epochs[name], self.missing[name])
+
+    def get_durations(self, is_delivered=False):
+        """
+        Returns a DataFrame with:
+        'order_id', 'order_status', 'approval_latency', 'handling_time',
+        'carrier_transit', 'wait_time', 'expected_wait_time', 'delay_vs_expected'
+        delay_vs_expected is only kept when positive (0 otherwise)
+        """
+        positions = np.flatnonzero(self.order_status == 'delivered') if is_delivered\
+            else np.arange(len(self.order_ids))
+
+        durations = pd.DataFrame({
+            'order_id': self.order_ids[positions],
+            'order_status': self.order_status[positions]
+        })
+        for stage, (start, end) in STAGES.items():
+            durations[stage] = self.get_duration(start, end, positions)
+
+        # Only delays longer than expected drive dissatisfaction (NaN count as 0)
+        delay = durations['delay_vs_expected'].to_numpy()
+        durations['delay_vs_expected'] = np.where(delay > 0, delay, 0)
+        return durations
+
+    def get_item_durations(self, order_items):
+        """
+        Returns a DataFrame aligned with `order_items` rows with:
+        'order_status', 'wait_time', 'delay_vs_shipping_limit'
+        (days between the shipping limit and the hand over to the carrier)
+        """
+        positions = self.order_ids.get_indexer(order_items['order_id'])
+        known = positions >= 0
+        limit, limit_missing = to_epoch(order_items['shipping_limit_date'])
+
+        safe = np.where(known, positions, 0)
+        delay = (self.epochs['carrier'][safe] - limit) / NS_PER_DAY
+        delay[self.missing['carrier'][safe] | limit_missing] = np.nan
+        wait_time = self.get_duration('purchase', 'delivered', safe)
+
+        durations = pd.DataFrame({
+            'order_status': self.order_status[safe],
+            'wait_time': wait_time,
+            'delay_vs_shipping_limit': delay
+        }, index=order_items.index)
+        # Items of unknown orders
+        durations.loc[~known] = np.nan
+        return durations
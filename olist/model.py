@@ -0,0 +1,229 @@
+import numpy as np
+import pandas as pd
+import patsy
+import statsmodels.api as sm
+from concurrent.futures import ThreadPoolExecutor
+from scipy import stats
+from olist.utils import return_significative_coef
+
+MODELS = {'ols': sm.OLS, 'logit': sm.Logit}
+
+
+class ModelFitter:
+    """
+    Fits many statsmodels formulas on the same training data.
+    Features are standardized once, and the patsy design matrices of each
+    left and right-hand side are cached, so that formula variants sharing
+    terms (e.g. ols and logit on the same features) are only built once.
+    """
+    def __init__(self, data, standardize=None):
+        # `standardize`: list of columns to z-score (x - mean) / std
+        self.data = data.copy()
+        if standardize:
+            features = self.data[standardize]
+            self.data[standardize] = (features - features.mean()) / features.std()
+        self._designs = {}
+
+    def get_design(self, side):
+        """
+        Returns the cached patsy design matrix (as a DataFrame)
+        for one side of a formula, e.g. 'wait_time + C(order_status)'
+        """
+        side = side.strip()
+        if side not in self._designs:
+            self._designs[side] = patsy.dmatrix(side,
+                                                self.data,
+                                                return_type='dataframe')
+        return self._designs[side]
+
+    def get_matrices(self, formula):
+        """
+        Returns (y, X) for `formula`, restricted to rows without NaN
+        on both sides
+        """
+        lhs, rhs = formula.split('~', 1)
+        y = self.get_design(f"{lhs} - 1")
+        X = self.get_design(rhs)
+
+        # patsy drops NaN rows independently on each side
+        index = y.index.intersection(X.index)
+        return y.loc[index].iloc[:, 0], X.loc[index]
+
+    def fit(self, formula, kind='ols', **fit_kwargs):
+        """
+        Returns the fitted statsmodels results of `formula`,
+        with kind 'ols' or 'logit'
+        """
+        y, X = self.get_matrices(formula)
+        if kind == 'logit':
+            fit_kwargs.setdefault('disp', 0)
+        return MODELS[kind](y, X).fit(**fit_kwargs)
+
+    def fit_many(self, formulas, kind='ols', n_jobs=None, **fit_kwargs):
+        """
+        Returns a dict {formula: fitted results}.
+        Fits run in `n_jobs` threads unless n_jobs=1
+        """
+        # Build all design matrices first: patsy is not thread-safe
+        for formula in formulas:
+            self.get_matrices(formula)
+
+        def fit(formula):
+            return self.fit(formula, kind, **fit_kwargs)
+
+        if n_jobs == 1:
+            results = [fit(formula) for formula in formulas]
+        else:
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                results = list(executor.map(fit, formulas))
+        return dict(zip(formulas, results))
+
+    def get_significance_table(self, formulas, kind='ols', alpha=0.05, n_jobs=None):
+        """
+        Returns a DataFrame with:
+        'formula', 'variable', 'p_value', 'coef'
+        for the significant coefficients of each formula
+        """
+        results = self.fit_many(formulas, kind, n_jobs)
+        tables = [
+            return_significative_coef(model, alpha).assign(formula=formula)
+            for formula, model in results.items()
+        ]
+        table = pd.concat(tables, ignore_index=True)
+        return table[['formula', 'variable', 'p_value', 'coef']]
+
+
+class StreamingResults:
+    """
+    Coefficients of a model fitted by StreamingFitter, with the same
+    attributes as statsmodels results: params, bse, tvalues, pvalues, nobs
+    """
+    def __init__(self, params, cov, nobs, df_resid=None, **extra):
+        self.params = params
+        self.cov_params_ = pd.DataFrame(cov, index=params.index, columns=params.index)
+        self.bse = pd.Series(np.sqrt(np.diag(cov)), index=params.index)
+        self.tvalues = self.params / self.bse
+        # t distribution for OLS, normal (z) for logit, as in statsmodels
+        self.dist = stats.norm if df_resid is None else stats.t(df_resid)
+        self.pvalues = pd.Series(2 * self.dist.sf(np.abs(self.tvalues)), index=params.index)
+        self.nobs = nobs
+        self.df_resid = df_resid
+        self.__dict__.update(extra)
+
+    def cov_params(self):
+        return self.cov_params_
+
+    def conf_int(self, alpha=0.05):
+        """
+        Returns a DataFrame with the lower and upper bounds (columns 0, 1)
+        """
+        margin = self.dist.ppf(1 - alpha / 2) * self.bse
+        return pd.DataFrame({0: self.params - margin, 1: self.params + margin})
+
+    def summary_frame(self, alpha=0.05):
+        """
+        Returns a DataFrame with:
+        'coef', 'std_err', 't', 'p_value', 'ci_lower', 'ci_upper'
+        """
+        ci = self.conf_int(alpha)
+        return pd.DataFrame({'coef': self.params, 'std_err': self.bse, 't': self.tvalues,
+                             'p_value': self.pvalues, 'ci_lower': ci[0], 'ci_upper': ci[1]})
+
+
+class StreamingFitter:
+    """
+    Fits OLS and logit formulas on training data too large for memory,
+    read as a stream of DataFrame chunks. OLS accumulates the exact
+    sufficient statistics X'X, X'y and y'y in a single pass; logit runs
+    IRLS (Newton) iterations, each one pass accumulating X'WX and X'(y - p).
+    Results match statsmodels OLS and Logit on the concatenated data.
+    """
+    def __init__(self, chunks, chunk_size=100000):
+        # `chunks`: a DataFrame (split into `chunk_size` rows) or a function
+        # returning a new iterator of DataFrames, e.g.
+        # lambda: pd.read_csv(path, chunksize=100000)
+        if isinstance(chunks, pd.DataFrame):
+            data = chunks
+            chunks = lambda: (data.iloc[start:start + chunk_size]
+                              for start in range(0, len(data), chunk_size))
+        self.chunks = chunks
+        self._design_infos = {}
+
+    def get_design_infos(self, formula):
+        """
+        Returns the cached patsy (y, X) design infos of `formula`, built
+        incrementally over all chunks (e.g. the levels of C(order_status))
+        """
+        if formula not in self._design_infos:
+            self._design_infos[formula] = patsy.incr_dbuilders(formula, self.chunks)
+        return self._design_infos[formula]
+
+    def iter_matrices(self, formula):
+        """
+        Yields (y, X) NumPy arrays for each chunk, without NaN rows
+        """
+        design_infos = self.get_design_infos(formula)
+        for chunk in self.chunks():
+            y, X = patsy.build_design_matrices(design_infos, chunk)
+            yield np.asarray(y)[:, 0], np.asarray(X)
+
+    def get_names(self, formula):
+        return self.get_design_infos(formula)[1].column_names
+
+    def fit_ols(self, formula):
+        """
+        Returns the StreamingResults of the OLS regression of `formula`
+        """
+        k = len(self.get_names(formula))
+        xtx, xty = np.zeros((k, k)), np.zeros(k)
+        yty, y_sum, n = 0.0, 0.0, 0
+        for y, X in self.iter_matrices(formula):
+            xtx += X.T @ X
+            xty += X.T @ y
+            yty += y @ y
+            y_sum += y.sum()
+            n += len(y)
+
+        params = np.linalg.solve(xtx, xty)
+        ssr = yty - 2 * params @ xty + params @ xtx @ params
+        df_resid = n - k
+        cov = ssr / df_resid * np.linalg.inv(xtx)
+        centered_tss = yty - y_sum ** 2 / n
+        return StreamingResults(pd.Series(params, index=self.get_names(formula)), cov, n,
+                                df_resid=df_resid, ssr=ssr,
+                                rsquared=1 - ssr / centered_tss)
+
+    def fit_logit(self, formula, max_iter=35, tol=1e-8):
+        """
+        Returns the StreamingResults of the logistic regression of
+        `formula` (binary 0/1 left-hand side), one pass per IRLS iteration
+        """
+        names = self.get_names(formula)
+        params = np.zeros(len(names))
+        for iteration in range(max_iter):
+            hessian, gradient = np.zeros((len(names), len(names))), np.zeros(len(names))
+            llf, n = 0.0, 0
+            for y, X in self.iter_matrices(formula):
+                linear = X @ params
+                p = 1 / (1 + np.exp(-linear))
+                hessian += X.T @ (X * (p * (1 - p))[:, None])
+                gradient += X.T @ (y - p)
+                llf += np.sum(y * linear - np.logaddexp(0, linear))
+                n += len(y)
+            step = np.linalg.solve(hessian, gradient)
+            params = params + step
+            if np.max(np.abs(step)) < tol:
+                break
+
+        # Covariance at the last parameters (inverse of the information matrix)
+        return StreamingResults(pd.Series(params, index=names), np.linalg.inv(hessian), n,
+                                llf=llf, n_iterations=iteration + 1,
+                                converged=np.max(np.abs(step)) < tol)
+
+    def fit(self, formula, kind='ols', **fit_kwargs):
+        """
+        Returns the StreamingResults of `formula`, with kind 'ols' or 'logit'
+        """
+        if kind == 'logit':
+            return self.fit_logit(formula, **fit_kwargs)
+        return self.fit_ols(formula, **fit_kwargs)
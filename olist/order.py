@@ -1,7 +1,46 @@
 import pandas as pd
 import numpy as np
-from olist.utils import haversine_distance
-from olist.data import Olist
+from functools import lru_cache
+from olist.utils import haversine_distances
+from olist.geolocation import Geolocation
+from olist.data import get_olist
+from olist.index import KeyIndex
+from olist.join import join_frames
+from olist.lifecycle import Lifecycle, TIMESTAMPS
+from olist.sketch import HyperLogLog
+
+
+def get_distances(item_zip_codes, locations):
+    """
+    Returns a DataFrame with:
+    order_id, distance_seller_customer
+    the average distance between the seller and the customer of the items
+    of each order (`item_zip_codes` of Order.get_item_zip_codes), located
+    with the cleaned `locations` of Geolocation.get_locations
+    """
+    geo_index = KeyIndex(locations, 'geolocation_zip_code_prefix', columns=[])
+
+    def locate(zip_codes):
+        # (lat, lng) of `zip_codes` (NaN when unknown)
+        rows = geo_index.lookup(zip_codes.to_numpy())
+        lat = np.where(rows >= 0, locations['geolocation_lat'].to_numpy()[rows], np.nan)
+        lng = np.where(rows >= 0, locations['geolocation_lng'].to_numpy()[rows], np.nan)
+        return lat, lng
+
+    lat_seller, lng_seller = locate(item_zip_codes['seller_zip_code_prefix'])
+    lat_customer, lng_customer = locate(item_zip_codes['customer_zip_code_prefix'])
+    distances = haversine_distances(lng_seller, lat_seller, lng_customer, lat_customer)
+
+    # Since an order can have multiple sellers,
+    # return the average of the distance per order
+    known = ~np.isnan(distances)
+    order_ids, inverse = np.unique(item_zip_codes['order_id'].to_numpy()[known],
+                                   return_inverse=True)
+    return pd.DataFrame({
+        'order_id': order_ids,
+        'distance_seller_customer':
+            np.bincount(inverse, weights=distances[known]) / np.bincount(inverse)
+    })
 
 
 class Order:
@@ -9,9 +48,23 @@ class Order:
     DataFrames containing all orders as index,
     and various properties of these orders as columns
     '''
-    def __init__(self):
+    def __init__(self, olist=None):
         # Assign an attribute ".data" to all new instances of Order
-        self.data = Olist().get_data()
+        self.olist = get_olist(olist)
+        self.data = self.olist.get_data()
+        # Point lookups: indexes are built on first use, features LRU-cached
+        self._indexes = None
+        self.get_features = lru_cache(maxsize=10000)(self._get_features)
+        self._lifecycle = None
+
+    def get_lifecycle(self):
+        """
+        Returns the Lifecycle of orders: timestamps parsed on first call
+        and stage durations (see olist/lifecycle.py)
+        """
+        if self._lifecycle is None:
+            self._lifecycle = Lifecycle(self.data)
+        return self._lifecycle
 
     def get_wait_time(self, is_delivered=True):
         """
@@ -21,48 +74,10 @@ class Order:
         """
         # Hint: Within this instance method, you have access to the instance of the class Order in the variable self, as well as all its attributes
         # $CHALLENGIFY_BEGIN
-        # make sure to create a copy rather than a "view"
-        orders = self.data['orders'].copy()
-
-        # filter delivered orders
-        if is_delivered:
-            orders = orders.query("order_status=='delivered'").copy()
-
-        # handle datetime
-        orders.loc[:, 'order_delivered_customer_date'] = \
-            pd.to_datetime(orders['order_delivered_customer_date'])
-        orders.loc[:, 'order_estimated_delivery_date'] = \
-            pd.to_datetime(orders['order_estimated_delivery_date'])
-        orders.loc[:, 'order_purchase_timestamp'] = \
-            pd.to_datetime(orders['order_purchase_timestamp'])
-
-        # compute delay vs expected
-        orders.loc[:, 'delay_vs_expected'] = \
-            (orders['order_delivered_customer_date'] -
-             orders['order_estimated_delivery_date']) / np.timedelta64(24, 'h')
-
-        def handle_delay(x):
-            # We only want to keep delay where wait_time is longer than expected (not the other way around)
-            # This is what drives customer dissatisfaction!
-            if x > 0:
-                return x
-            else:
-                return 0
-
-        orders.loc[:, 'delay_vs_expected'] = \
-            orders['delay_vs_expected'].apply(handle_delay)
-
-        # compute wait time
-        orders.loc[:, 'wait_time'] = \
-            (orders['order_delivered_customer_date'] -
-             orders['order_purchase_timestamp']) / np.timedelta64(24, 'h')
-
-        # compute expected wait time
-        orders.loc[:, 'expected_wait_time'] = \
-            (orders['order_estimated_delivery_date'] -
-             orders['order_purchase_timestamp']) / np.timedelta64(24, 'h')
-
-        return orders[[
+        # All timestamps are parsed once, in the shared order lifecycle
+        durations = self.get_lifecycle().get_durations(is_delivered)
+
+        return durations[[
             'order_id', 'wait_time', 'expected_wait_time', 'delay_vs_expected',
             'order_status'
         ]]
@@ -74,57 +89,19 @@ class Order:
         order_id, dim_is_five_star, dim_is_one_star, review_score
         """
         # $CHALLENGIFY_BEGIN
-        # import data
-        reviews = self.data['order_reviews']
-
-        def dim_five_star(d):
-            if d == 5:
-                return 1
-            else:
-                return 0
-
-        def dim_four_star(d):
-            if d == 4:
-                return 1
-            else:
-                return 0
-
-        def dim_three_star(d):
-            if d == 3:
-                return 1
-            else:
-                return 0
-            
-        def dim_two_star(d):
-            if d == 2:
-                return 1
-            else:
-                return 0
-
-        def dim_one_star(d):
-            if d == 1:
-                return 1
-            else:
-                return 0
-
-        reviews.loc[:, 'dim_is_five_star'] =\
-            reviews['review_score'].apply(dim_five_star)
-
-        reviews.loc[:, 'dim_is_four_star'] =\
-            reviews['review_score'].apply(dim_four_star)
-            
-        reviews.loc[:, 'dim_is_three_star'] =\
-            reviews['review_score'].apply(dim_three_star)
-
-        reviews.loc[:, 'dim_is_two_star'] =\
-            reviews['review_score'].apply(dim_two_star)
-        
-        reviews.loc[:, 'dim_is_one_star'] =\
-            reviews['review_score'].apply(dim_one_star)
-
-        return reviews[[
-            'order_id', 'dim_is_five_star', 'dim_is_four_star', 'dim_is_three_star', 'dim_is_two_star', 'dim_is_one_star', 'review_score'
-        ]]
+        # Only project the needed columns: self.data is never modified
+        reviews = self.data['order_reviews'][['order_id', 'review_score']]
+        scores = reviews['review_score']
+
+        return pd.DataFrame({
+            'order_id': reviews['order_id'],
+            'dim_is_five_star': (scores == 5).astype(int),
+            'dim_is_four_star': (scores == 4).astype(int),
+            'dim_is_three_star': (scores == 3).astype(int),
+            'dim_is_two_star': (scores == 2).astype(int),
+            'dim_is_one_star': (scores == 1).astype(int),
+            'review_score': scores
+        })
         # $CHALLENGIFY_END
 
     def get_number_products(self):
@@ -142,13 +119,21 @@ class Order:
         return products
         # $CHALLENGIFY_END
 
-    def get_number_sellers(self):
+    def get_number_sellers(self, approx=False, error=0.01):
         """
         Returns a DataFrame with:
         order_id, number_of_sellers
+        estimated with HyperLogLog sketches (relative `error`) if approx
         """
         # $CHALLENGIFY_BEGIN
         data = self.data
+        if approx:
+            sketch = HyperLogLog(error).update(data['order_items']['order_id'],
+                                               data['order_items']['seller_id'])
+            sellers = sketch.estimate().round().astype(int).reset_index()
+            sellers.columns = ['order_id', 'number_of_sellers']
+            return sellers
+
         sellers = \
             data['order_items']\
             .groupby('order_id')['seller_id'].nunique().reset_index()
@@ -174,105 +159,194 @@ class Order:
         # $CHALLENGIFY_END
 
     # Optional
-    def get_distance_seller_customer(self):
+    def get_distance_seller_customer(self, locations=None):
         """
         Returns a DataFrame with:
         order_id, distance_seller_customer
+        using the cleaned `locations` of Geolocation.get_locations (loaded if None)
         """
         # $CHALLENGIFY_BEGIN
 
-        # import data
+        # Since one zip code can map to multiple (lat, lng), take the robust
+        # centroid of its cleaned points (computed once, cached on disk)
+        geo = Geolocation(self.olist).get_locations() if locations is None else locations
+        return get_distances(self.get_item_zip_codes(), geo)
+        # $CHALLENGIFY_END
+
+    def get_item_zip_codes(self):
+        """
+        Returns a DataFrame with:
+        order_id, seller_zip_code_prefix, customer_zip_code_prefix
+        for each order item whose seller and customer are known
+        """
         data = self.data
         orders = data['orders']
         order_items = data['order_items']
         sellers = data['sellers']
         customers = data['customers']
 
-        # Since one zip code can map to multiple (lat, lng), take the first one
-        geo = data['geolocation']
-        geo = geo.groupby('geolocation_zip_code_prefix',
-                          as_index=False).first()
-
-        # Merge geo_location for sellers
-        sellers_mask_columns = [
-            'seller_id', 'seller_zip_code_prefix', 'geolocation_lat', 'geolocation_lng'
-        ]
-
-        sellers_geo = sellers.merge(
-            geo,
-            how='left',
-            left_on='seller_zip_code_prefix',
-            right_on='geolocation_zip_code_prefix')[sellers_mask_columns]
-
-        # Merge geo_location for customers
-        customers_mask_columns = ['customer_id', 'customer_zip_code_prefix', 'geolocation_lat', 'geolocation_lng']
-
-        customers_geo = customers.merge(
-            geo,
-            how='left',
-            left_on='customer_zip_code_prefix',
-            right_on='geolocation_zip_code_prefix')[customers_mask_columns]
-
-        # Match customers with sellers in one table
-        customers_sellers = customers.merge(orders, on='customer_id')\
-            .merge(order_items, on='order_id')\
-            .merge(sellers, on='seller_id')\
-            [['order_id', 'customer_id','customer_zip_code_prefix', 'seller_id', 'seller_zip_code_prefix']]
-        
-        # Add the geoloc
-        matching_geo = customers_sellers.merge(sellers_geo,
-                                            on='seller_id')\
-            .merge(customers_geo,
-                   on='customer_id',
-                   suffixes=('_seller',
-                             '_customer'))
-        # Remove na()
-        matching_geo = matching_geo.dropna()
-
-        matching_geo.loc[:, 'distance_seller_customer'] =\
-            matching_geo.apply(lambda row:
-                               haversine_distance(row['geolocation_lng_seller'],
-                                                  row['geolocation_lat_seller'],
-                                                  row['geolocation_lng_customer'],
-                                                  row['geolocation_lat_customer']),
-                               axis=1)
-        # Since an order can have multiple sellers,
-        # return the average of the distance per order
-        order_distance =\
-            matching_geo.groupby('order_id',
-                                 as_index=False).agg({'distance_seller_customer':
-                                                      'mean'})
-
-        return order_distance
-        # $CHALLENGIFY_END
+        # Match each order item with its seller and customer
+        seller_rows = KeyIndex(sellers, 'seller_id', columns=[]).lookup(order_items['seller_id'])
+        order_rows = KeyIndex(orders, 'order_id', columns=[]).lookup(order_items['order_id'])
+        customer_rows = np.full(len(order_items), -1)
+        customer_rows[order_rows >= 0] = KeyIndex(customers, 'customer_id', columns=[]).lookup(
+            orders['customer_id'].to_numpy()[order_rows[order_rows >= 0]])
+
+        known = (seller_rows >= 0) & (customer_rows >= 0)
+        return pd.DataFrame({
+            'order_id': order_items['order_id'].to_numpy()[known],
+            'seller_zip_code_prefix':
+                sellers['seller_zip_code_prefix'].to_numpy()[seller_rows[known]],
+            'customer_zip_code_prefix':
+                customers['customer_zip_code_prefix'].to_numpy()[customer_rows[known]]
+        })
+
+    def get_payments(self, order_ids=None):
+        """
+        Returns a DataFrame with:
+        order_id, payment_value, payment_installments, payment_sequentials,
+        and the number of payments of each type (n_payments_credit_card...)
+        one row per order_id of `order_ids` in the same order if given
+        (NaN for orders without payment), else per order in order_payments
+        """
+        payments = self.data['order_payments']
+
+        # Position of each payment in the output, without any merge
+        if order_ids is None:
+            codes, order_ids = pd.factorize(payments['order_id'], sort=True)
+            rows = np.arange(len(order_ids))
+        else:
+            rows, order_ids = pd.factorize(pd.Series(order_ids))
+            codes = order_ids.get_indexer(payments['order_id'])
+        # Same payment type columns whatever the orders
+        type_codes, types = pd.factorize(payments['payment_type'], sort=True)
+
+        known = codes >= 0
+        codes = codes[known]
+        type_codes = type_codes[known]
+        payments = payments[known]
+        n_orders = len(order_ids)
+
+        # One-hot counts of payment types, in a single bincount
+        type_counts = np.bincount(codes * len(types) + type_codes,
+                                  minlength=n_orders * len(types))\
+            .reshape(n_orders, len(types))
+
+        value = np.bincount(codes,
+                            weights=payments['payment_value'],
+                            minlength=n_orders)
+        installments = np.zeros(n_orders)
+        np.maximum.at(installments, codes, payments['payment_installments'])
+        sequentials = np.zeros(n_orders)
+        np.maximum.at(sequentials, codes, payments['payment_sequential'])
+
+        result = pd.DataFrame(type_counts,
+                              columns=[f"n_payments_{t}" for t in types])
+        result.insert(0, 'payment_sequentials', sequentials)
+        result.insert(0, 'payment_installments', installments)
+        result.insert(0, 'payment_value', value)
+        result.loc[type_counts.sum(axis=1) == 0] = np.nan
+        result.insert(0, 'order_id', order_ids)
+
+        return result.iloc[rows].reset_index(drop=True)
 
     def get_training_data(self,
                           is_delivered=True,
-                          with_distance_seller_customer=False):
+                          with_distance_seller_customer=False,
+                          with_payments=False):
         """
         Returns a clean DataFrame (without NaN), with the all following columns:
         ['order_id', 'wait_time', 'expected_wait_time', 'delay_vs_expected',
         'order_status', 'dim_is_five_star', 'dim_is_one_star', 'review_score',
         'number_of_products', 'number_of_sellers', 'price', 'freight_value',
         'distance_seller_customer']
+        and the columns of `get_payments` plus 'payment_mismatch' if with_payments
         """
         # Hint: make sure to re-use your instance methods defined above
         # $CHALLENGIFY_BEGIN
-        training_set =\
-            self.get_wait_time(is_delivered)\
-                .merge(
-                self.get_review_score(), on='order_id'
-            ).merge(
-                self.get_number_products(), on='order_id'
-            ).merge(
-                self.get_number_sellers(), on='order_id'
-            ).merge(
-                self.get_price_and_freight(), on='order_id'
-            )
+        features = [
+            self.get_wait_time(is_delivered),
+            self.get_review_score(),
+            self.get_number_products(),
+            self.get_number_sellers(),
+            self.get_price_and_freight()
+        ]
         # Skip heavy computation of distance_seller_customer unless specified
         if with_distance_seller_customer:
-            training_set = training_set.merge(
-                self.get_distance_seller_customer(), on='order_id')
+            features.append(self.get_distance_seller_customer())
+        # Inner join on order_id by binary search, columns assembled once
+        training_set = join_frames(features, on='order_id')
+
+        # Payments are computed aligned to training_set rows: no merge needed
+        if with_payments:
+            payments = self.get_payments(training_set['order_id'])
+            payments.index = training_set.index
+            training_set = pd.concat(
+                [training_set, payments.drop(columns='order_id')], axis=1)
+            training_set['payment_mismatch'] = training_set['payment_value'] -\
+                training_set['price'] - training_set['freight_value']
 
         return training_set.dropna()
         # $CHALLENGIFY_END
+
+    def get_indexes(self):
+        """
+        Returns a dict of KeyIndex on 'orders', 'order_items' and
+        'order_reviews', all keyed by order_id (built on first call)
+        """
+        if self._indexes is None:
+            data = self.data
+            lifecycle = self.get_lifecycle()
+            orders = pd.DataFrame({
+                'order_id': lifecycle.order_ids,
+                'order_status': lifecycle.order_status,
+                **{name: lifecycle.get_days(name) for name in TIMESTAMPS}
+            })
+            self._indexes = {
+                'orders': KeyIndex(orders, 'order_id'),
+                'order_items': KeyIndex(data['order_items'], 'order_id',
+                                        ['seller_id', 'price', 'freight_value']),
+                'order_reviews': KeyIndex(data['order_reviews'], 'order_id',
+                                          ['review_score'])
+            }
+        return self._indexes
+
+    def _get_features(self, order_id):
+        """
+        Returns a dict with the columns of `get_training_data` for one
+        `order_id` (None if unknown), only touching the rows of this order.
+        Reviews are averaged when an order has several of them.
+        """
+        indexes = self.get_indexes()
+        order = indexes['orders'].get(order_id)
+        if len(order['order_status']) == 0:
+            return None
+        items = indexes['order_items'].get(order_id)
+        scores = indexes['order_reviews'].get(order_id)['review_score']
+
+        purchase = order['purchase'][0]
+        delivered = order['delivered'][0]
+        estimated = order['estimated'][0]
+        delay = delivered - estimated
+
+        def share(mask):
+            return mask.mean() if len(scores) else np.nan
+
+        return {
+            'order_id': order_id,
+            'wait_time': delivered - purchase,
+            'expected_wait_time': estimated - purchase,
+            'delay_vs_expected': delay if delay > 0 else 0,
+            'order_status': order['order_status'][0],
+            'dim_is_five_star': share(scores == 5),
+            'dim_is_four_star': share(scores == 4),
+            'dim_is_three_star': share(scores == 3),
+            'dim_is_two_star': share(scores == 2),
+            'dim_is_one_star': share(scores == 1),
+            'review_score': share(scores),
+            'number_of_products': len(items['seller_id']),
+            'number_of_sellers': len(set(items['seller_id'])),
+            'price': items['price'].sum(),
+            'freight_value': items['freight_value'].sum()
+        }
+
@@ -1,16 +1,33 @@
 
 import pandas as pd
 import numpy as np
-from olist.data import Olist
+from olist.data import get_olist
 from olist.order import Order
+from olist.sketch import HyperLogLog
+from olist.join import join_frames
+
+
+def parse_quantile(name):
+    """
+    Returns the quantile (in [0, 1]) of aggregation `name`, e.g. 0.9 for 'q90'
+    """
+    try:
+        percent = float(name[1:])
+    except ValueError:
+        percent = np.nan
+    if not 0 <= percent <= 100:
+        raise ValueError(f"unknown aggregation {name!r}: quantiles are 'q' followed by "
+                         "a percentage between 0 and 100, e.g. 'q90' or 'q99.5'")
+    return percent / 100
 
 
 class Product:
-    def __init__(self):
+    def __init__(self, olist=None):
         # Import data only once
-        olist = Olist()
-        self.data = olist.get_data()
-        self.order = Order()
+        self.olist = get_olist(olist)
+        self.data = self.olist.get_data()
+        self.order = Order(self.olist)
+        self._category_groups = None
 
     def get_product_features(self):
         """
@@ -81,15 +98,21 @@ class Product:
 
         return result
 
-    def get_quantity(self):
+    def get_quantity(self, approx=False, error=0.01):
         """
         Returns a DataFrame with:
         'product_id', 'n_orders', 'quantity'
+        with n_orders estimated by HyperLogLog (relative `error`) if approx
         """
         order_items = self.data['order_items']
 
-        n_orders =\
-            order_items.groupby('product_id')['order_id'].nunique().reset_index()
+        if approx:
+            n_orders = HyperLogLog(error)\
+                .update(order_items['product_id'], order_items['order_id'])\
+                .estimate().round().astype(int).reset_index()
+        else:
+            n_orders =\
+                order_items.groupby('product_id')['order_id'].nunique().reset_index()
         n_orders.columns = ['product_id', 'n_orders']
 
         quantity = \
@@ -118,21 +141,15 @@ class Product:
        'price', 'share_of_one_stars', 'share_of_five_stars', 'review_score',
        'n_orders', 'quantity', 'sales'],
         """
-        training_set =\
-            self.get_product_features()\
-                .merge(
-                self.get_wait_time(), on='product_id'
-               ).merge(
-                self.get_price(), on='product_id'
-               ).merge(
-                self.get_review_score(), on='product_id'
-               ).merge(
-                self.get_quantity(), on='product_id'
-               ).merge(
-                self.get_sales(), on='product_id'
-               )
-
-        return training_set
+        # Inner join on product_id by binary search, columns assembled once
+        return join_frames([
+            self.get_product_features(),
+            self.get_wait_time(),
+            self.get_price(),
+            self.get_review_score(),
+            self.get_quantity(),
+            self.get_sales()
+        ], on='product_id')
 
     def get_product_cat(self, agg="mean"):
         '''
@@ -140,6 +157,38 @@ class Product:
         - `quantity`: total number of products sold for this category.
         - `product_weight_g`: mean or median weight per category
         - ...
+        `agg` can be 'mean', 'median', 'sum', a quantile such as 'q90',
+        or a list of these: columns are then a MultiIndex (column, agg).
+        `quantity` is always summed, as ('quantity', 'sum') for a list.
         '''
-        pass  # YOUR CODE HERE
-
+        # Build product features and group them by category only once
+        if self._category_groups is None:
+            products = self.get_training_data()
+            columns = list(products.select_dtypes(include='number').columns)
+            self._category_groups = products[columns + ['category']]\
+                .groupby('category')
+        groups = self._category_groups
+
+        names = [agg] if isinstance(agg, str) else list(agg)
+        quantiles = {name: parse_quantile(name) for name in names
+                     if isinstance(name, str) and name.startswith('q')}
+        functions = [name for name in names if name not in quantiles]
+        columns = [column for column in groups.obj.columns if column != 'category']
+        measures = [column for column in columns if column != 'quantity']
+
+        # Other aggregations in one groupby pass, quantiles vectorized by groupby.quantile
+        parts = [groups.agg({
+            column: ['sum'] if column == 'quantity' else functions
+            for column in columns if column == 'quantity' or functions
+        })]
+        for name, q in quantiles.items():
+            part = groups[measures].quantile(q)
+            part.columns = pd.MultiIndex.from_product([measures, [name]])
+            parts.append(part)
+        product_cat = pd.concat(parts, axis=1)[[
+            (column, name) for column in columns
+            for name in (['sum'] if column == 'quantity' else names)
+        ]]
+        if isinstance(agg, str):
+            product_cat.columns = product_cat.columns.get_level_values(0)
+        return product_cat
@@ -0,0 +1,188 @@
+"""
+Registry of the alternative implementations of each feature method
+(olist/order.py, order_old.py, order_martin.py, seller.py, seller_old.py,
+data.py, data_try.py), to compare their outputs and timings on the same
+data and pick the fastest one that conforms to the reference.
+
+    from olist.registry import compare, get_fastest
+    compare('order.get_wait_time')
+    wait_time = get_fastest('order.get_wait_time')()
+"""
+import importlib
+import time
+import numpy as np
+import pandas as pd
+
+# feature: {implementation: (module, class, method)}
+# the first implementation registered for a feature is its reference
+REGISTRY = {}
+
+# Comparison results, keyed by feature
+_comparisons = {}
+
+ORDER_METHODS = ['get_wait_time', 'get_review_score', 'get_number_products',
+                 'get_number_sellers', 'get_price_and_freight',
+                 'get_distance_seller_customer', 'get_training_data']
+
+SELLER_METHODS = ['get_seller_features', 'get_seller_delay_wait_time', 'get_active_dates',
+                  'get_quantity', 'get_sales', 'get_review_score', 'get_training_data']
+
+
+def register(feature, name, module, cls, method):
+    """
+    Registers `cls.method` of olist `module` as implementation `name`
+    of `feature` (e.g. 'order.get_wait_time')
+    """
+    REGISTRY.setdefault(feature, {})[name] = (module, cls, method)
+    _comparisons.pop(feature, None)
+
+
+for method in ORDER_METHODS:
+    for module in ['order', 'order_old', 'order_martin']:
+        register(f"order.{method}", module, module, 'Order', method)
+for method in SELLER_METHODS:
+    for module in ['seller', 'seller_old']:
+        register(f"seller.{method}", module, module, 'Seller', method)
+for module in ['data', 'data_try']:
+    register('data.get_data', module, module, 'Olist', 'get_data')
+
+
+def get_implementations(feature):
+    """
+    Returns the dict {implementation: (module, class, method)} of `feature`.
+    Raises a ValueError for unknown features
+    """
+    if feature not in REGISTRY:
+        raise ValueError(f"unknown feature {feature!r}: registered features are "
+                         f"{sorted(REGISTRY)}")
+    return REGISTRY[feature]
+
+
+def get_implementation(feature, name):
+    """
+    Returns a function without arguments running implementation `name`
+    of `feature` on a new instance of its class. Raises a ValueError for
+    unknown features or implementations
+    """
+    implementations = get_implementations(feature)
+    if name not in implementations:
+        raise ValueError(f"unknown implementation {name!r} of {feature}: "
+                         f"registered implementations are {list(implementations)}")
+    module, cls, method = implementations[name]
+    instance = getattr(importlib.import_module(f"olist.{module}"), cls)()
+    return getattr(instance, method)
+
+
+def to_frames(output):
+    # get_data returns a dict of DataFrames, feature methods a DataFrame
+    if isinstance(output, dict):
+        return output
+    return {'': output}
+
+
+def diff(output, reference, rtol=1e-6, atol=1e-9):
+    """
+    Returns a dict describing the differences of `output` with `reference`:
+    'missing_columns', 'extra_columns', 'row_difference' (number of rows),
+    'different_columns' (common columns with different values), 'max_abs_diff'
+    """
+    result = {'missing_columns': [], 'extra_columns': [], 'row_difference': 0,
+              'different_columns': [], 'max_abs_diff': 0.0}
+    output, reference = to_frames(output), to_frames(reference)
+    for table in reference.keys() - output.keys():
+        result['missing_columns'].append(f"{table}.*")
+    for table in reference.keys() & output.keys():
+        prefix = f"{table}." if table else ''
+        df, ref = output[table], reference[table]
+        # Some implementations return their key as index (unnamed indexes
+        # are only row labels, e.g. after filtering)
+        df = df.reset_index(drop=all(name is None for name in df.index.names))
+        ref = ref.reset_index(drop=all(name is None for name in ref.index.names))
+        result['missing_columns'] += [prefix + c for c in ref.columns if c not in df.columns]
+        result['extra_columns'] += [prefix + c for c in df.columns if c not in ref.columns]
+        result['row_difference'] += len(df) - len(ref)
+        columns = [column for column in ref.columns if column in df.columns]
+        if len(df) != len(ref) or not columns:
+            continue
+
+        # Rows compared in the order of the common columns
+        df = df[columns].sort_values(columns, ignore_index=True)
+        ref = ref[columns].sort_values(columns, ignore_index=True)
+        for column in columns:
+            a, b = df[column], ref[column]
+            if pd.api.types.is_numeric_dtype(a) and pd.api.types.is_numeric_dtype(b):
+                a, b = a.to_numpy(dtype=float), b.to_numpy(dtype=float)
+                if not np.allclose(a, b, rtol=rtol, atol=atol, equal_nan=True):
+                    result['different_columns'].append(prefix + column)
+                    result['max_abs_diff'] = max(result['max_abs_diff'],
+                                                 float(np.nanmax(np.abs(a - b))))
+            elif not a.equals(b):
+                result['different_columns'].append(prefix + column)
+    return result
+
+
+def compare(feature, n_repeat=3, rtol=1e-6):
+    """
+    Runs every implementation of `feature` on the same data and returns
+    a DataFrame indexed by implementation with: 'seconds' (best of
+    `n_repeat` runs), 'conforms' (same rows, columns and values as the
+    reference implementation), the differences of `diff` and 'error'
+    """
+    outputs, rows = {}, []
+    for name in get_implementations(feature):
+        row = {'implementation': name, 'seconds': np.nan, 'error': None}
+        try:
+            function = get_implementation(feature, name)
+            timings = []
+            for _ in range(n_repeat):
+                start = time.perf_counter()
+                outputs[name] = function()
+                timings.append(time.perf_counter() - start)
+            row['seconds'] = min(timings)
+        except Exception as e:  # pylint: disable=broad-except
+            row['error'] = f"{type(e).__name__}: {e}"
+        rows.append(row)
+
+    reference = next(iter(REGISTRY[feature]))
+    for row in rows:
+        name = row['implementation']
+        if name not in outputs or reference not in outputs:
+            row['conforms'] = False
+            continue
+        if outputs[name] is None:
+            row['conforms'] = False
+            row['error'] = 'returned None'
+            continue
+        row.update(diff(outputs[name], outputs[reference], rtol=rtol))
+        row['conforms'] = not (row['missing_columns'] or row['extra_columns'] or
+                               row['row_difference'] or row['different_columns'])
+
+    _comparisons[feature] = pd.DataFrame(rows).set_index('implementation')
+    return _comparisons[feature]
+
+
+def get_fastest(feature, n_repeat=3):
+    """
+    Returns the function of the fastest implementation of `feature`
+    conforming to the reference (compared once, then cached). Raises a
+    ValueError if none conforms, e.g. when the reference fails
+    """
+    if feature not in _comparisons:
+        compare(feature, n_repeat)
+    comparison = _comparisons[feature]
+    conforming = comparison[comparison['conforms']]
+    if conforming.empty:
+        errors = comparison['error'].dropna()
+        raise ValueError(f"no implementation of {feature} conforms to its reference "
+                         f"{next(iter(REGISTRY[feature]))}: {errors.to_dict()}")
+    name = conforming['seconds'].idxmin()
+    return get_implementation(feature, name)
+
+
+def compare_all(n_repeat=1):
+    """
+    Returns the comparisons of all registered features in one DataFrame
+    indexed by (feature, implementation)
+    """
+    return pd.concat({feature: compare(feature, n_repeat) for feature in REGISTRY},
+                     names=['feature'])
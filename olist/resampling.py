@@ -0,0 +1,125 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+# Max number of cells drawn at once: bounds memory to ~80MB of int64 indexes
+MAX_CELLS = 10_000_000
+
+
+def _batches(n_resamples, n_cells_per_resample, seed):
+    """
+    Splits `n_resamples` into batches fitting in MAX_CELLS, each with its
+    own child seed, so results do not depend on the number of processes
+    """
+    batch_size = max(1, min(n_resamples, MAX_CELLS // max(1, n_cells_per_resample)))
+    sizes = [batch_size] * (n_resamples // batch_size)
+    if n_resamples % batch_size:
+        sizes.append(n_resamples % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    return list(zip(sizes, seeds))
+
+
+def _run(worker, data, batches, n_jobs):
+    # One task per process, holding contiguous batches, to send `data` once
+    if n_jobs == 1:
+        return worker(data, batches)
+    n_tasks = min(len(batches), n_jobs or os.cpu_count() or 1)
+    bounds = np.linspace(0, len(batches), n_tasks + 1).astype(int)
+    chunks = [batches[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        return np.concatenate(list(executor.map(worker, [data] * n_tasks, chunks)))
+
+
+def _bootstrap_worker(data, batches):
+    values, statistic = data
+    stats = []
+    for size, seed in batches:
+        rng = np.random.default_rng(seed)
+        indexes = rng.integers(0, len(values), size=(size, len(values)))
+        stats.append(statistic(values[indexes], axis=1))
+    return np.concatenate(stats)
+
+
+def _grouped_worker(data, batches):
+    group_sums, group_counts = data
+    n_groups = len(group_sums)
+    stats = []
+    for size, seed in batches:
+        rng = np.random.default_rng(seed)
+        # Number of times each group is drawn in each resample
+        weights = rng.multinomial(n_groups, np.full(n_groups, 1 / n_groups), size=size)
+        stats.append((weights @ group_sums) / (weights @ group_counts))
+    return np.concatenate(stats)
+
+
+def _permutation_worker(data, batches):
+    pooled, n_x, statistic = data
+    stats = []
+    for size, seed in batches:
+        rng = np.random.default_rng(seed)
+        permuted = rng.permuted(np.tile(pooled, (size, 1)), axis=1)
+        stats.append(statistic(permuted[:, :n_x], axis=1) -
+                     statistic(permuted[:, n_x:], axis=1))
+    return np.concatenate(stats)
+
+
+def _confidence_interval(estimate, stats, alpha):
+    lower, upper = np.quantile(stats, [alpha / 2, 1 - alpha / 2])
+    return pd.Series({'estimate': estimate, 'ci_lower': lower, 'ci_upper': upper})
+
+
+def bootstrap_ci(values, statistic=np.mean, n_resamples=10000, alpha=0.05,
+                 seed=None, n_jobs=1):
+    """
+    Returns a Series with 'estimate', 'ci_lower', 'ci_upper':
+    percentile bootstrap confidence interval of `statistic` on `values`.
+    `statistic` must accept an `axis` argument (np.mean, np.median...)
+    and be picklable when n_jobs != 1.
+    """
+    values = pd.Series(values).dropna().to_numpy()
+    batches = _batches(n_resamples, len(values), seed)
+    stats = _run(_bootstrap_worker, (values, statistic), batches, n_jobs)
+    return _confidence_interval(statistic(values), stats, alpha)
+
+
+def grouped_bootstrap_ci(values, groups, n_resamples=10000, alpha=0.05,
+                         seed=None, n_jobs=1):
+    """
+    Returns a Series with 'estimate', 'ci_lower', 'ci_upper':
+    bootstrap confidence interval of the mean of `values`, resampling
+    whole groups (e.g. seller_id) rather than rows
+    """
+    df = pd.DataFrame({'values': values, 'groups': groups}).dropna()
+    by_group = df.groupby('groups')['values'].agg(['sum', 'count'])
+    group_sums = by_group['sum'].to_numpy(dtype=float)
+    group_counts = by_group['count'].to_numpy(dtype=float)
+
+    batches = _batches(n_resamples, len(group_sums), seed)
+    stats = _run(_grouped_worker, (group_sums, group_counts), batches, n_jobs)
+    return _confidence_interval(df['values'].mean(), stats, alpha)
+
+
+def permutation_test(x, y, statistic=np.mean, n_resamples=10000,
+                     alternative='two-sided', seed=None, n_jobs=1):
+    """
+    Returns a Series with 'difference', 'p_value':
+    permutation test of statistic(x) - statistic(y), with alternative
+    'two-sided', 'greater' or 'less'
+    """
+    x = pd.Series(x).dropna().to_numpy()
+    y = pd.Series(y).dropna().to_numpy()
+    pooled = np.concatenate([x, y])
+    observed = statistic(x) - statistic(y)
+
+    batches = _batches(n_resamples, len(pooled), seed)
+    stats = _run(_permutation_worker, (pooled, len(x), statistic), batches, n_jobs)
+
+    if alternative == 'greater':
+        extreme = stats >= observed
+    elif alternative == 'less':
+        extreme = stats <= observed
+    else:
+        extreme = np.abs(stats) >= np.abs(observed)
+    p_value = (extreme.sum() + 1) / (n_resamples + 1)
+    return pd.Series({'difference': observed, 'p_value': p_value})
@@ -1,80 +1,91 @@
 
 import pandas as pd
 import numpy as np
-from olist.data import Olist
+from functools import lru_cache
+from olist.data import get_olist
 from olist.order import Order
+from olist.sketch import HyperLogLog, QuantileSketch
+from olist.index import KeyIndex
+from olist.join import join_frames
+from olist.lifecycle import to_days, to_epoch
+from olist.cohort import Cohort
 
 
 class Seller:
-    def __init__(self):
+    def __init__(self, olist=None):
         # Import data only once
-        olist = Olist()
-        self.data = olist.get_data()
-        self.order = Order()
+        self.olist = get_olist(olist)
+        self.data = self.olist.get_data()
+        self.order = Order(self.olist)
+        # Point lookups: indexes are built on first use, features LRU-cached
+        self._indexes = None
+        self.get_features = lru_cache(maxsize=10000)(self._get_features)
 
     def get_seller_features(self):
         """
         Returns a DataFrame with:
         'seller_id', 'seller_city', 'seller_state'
         """
-        sellers = self.data['sellers'].copy(
-        )  # Make a copy before using inplace=True so as to avoid modifying self.data
-        sellers.drop('seller_zip_code_prefix', axis=1, inplace=True)
-        sellers.drop_duplicates(
-            inplace=True)  # There can be multiple rows per seller
-        return sellers
+        # Projecting creates a new frame: no copy of self.data needed
+        sellers = self.data['sellers'][['seller_id', 'seller_city', 'seller_state']]
+        return sellers.drop_duplicates()  # There can be multiple rows per seller
 
     def get_seller_delay_wait_time(self):
         """
         Returns a DataFrame with:
         'seller_id', 'delay_to_carrier', 'wait_time'
         """
-        # Get data
-        order_items = self.data['order_items'].copy()
-        orders = self.data['orders'].query("order_status=='delivered'").copy()
-
-        ship = order_items.merge(orders, on='order_id')
-
-        # Handle datetime
-        ship.loc[:, 'shipping_limit_date'] = pd.to_datetime(
-            ship['shipping_limit_date'])
-        ship.loc[:, 'order_delivered_carrier_date'] = pd.to_datetime(
-            ship['order_delivered_carrier_date'])
-        ship.loc[:, 'order_delivered_customer_date'] = pd.to_datetime(
-            ship['order_delivered_customer_date'])
-        ship.loc[:, 'order_purchase_timestamp'] = pd.to_datetime(
-            ship['order_purchase_timestamp'])
-
-        # Compute delay and wait_time
-        def delay_to_logistic_partner(d):
-            days = np.mean(
-                (d.order_delivered_carrier_date - d.shipping_limit_date) /
-                np.timedelta64(24, 'h'))
-            if days > 0:
-                return days
-            else:
-                return 0
-
-        def order_wait_time(d):
-            days = np.mean(
-                (d.order_delivered_customer_date - d.order_purchase_timestamp)
-                / np.timedelta64(24, 'h'))
-            return days
-
-        delay = ship.groupby('seller_id')\
-                    .apply(delay_to_logistic_partner)\
-                    .reset_index()
-        delay.columns = ['seller_id', 'delay_to_carrier']
+        # Durations of each item, from the timestamps parsed once per order
+        order_items = self.data['order_items']
+        ship = self.order.get_lifecycle().get_item_durations(order_items)
+        ship['seller_id'] = order_items['seller_id']
+        ship = ship[ship['order_status'] == 'delivered']
 
-        wait = ship.groupby('seller_id')\
-                   .apply(order_wait_time)\
-                   .reset_index()
-        wait.columns = ['seller_id', 'wait_time']
+        df = ship.groupby('seller_id', as_index=False).agg(
+            delay_to_carrier=('delay_vs_shipping_limit', 'mean'),
+            wait_time=('wait_time', 'mean'))
 
-        df = delay.merge(wait, on='seller_id')
+        # Only keep positive delays to the logistic partner
+        df['delay_to_carrier'] = df['delay_to_carrier'].where(
+            df['delay_to_carrier'] > 0, 0)
 
         return df
 
+    def get_delay_wait_time_quantiles(self, quantiles=(0.5, 0.9), approx=False,
+                                      relative_error=0.01):
+        """
+        Returns a DataFrame with:
+        'seller_id', 'delay_to_carrier_p50', 'wait_time_p50', ... for each quantile,
+        estimated with sketches (relative error on values) if approx.
+        Quantiles are the lower order statistic (no interpolation) in
+        both cases, so that sketches are within relative_error of them
+        """
+        order_items = self.data['order_items']
+        ship = self.order.get_lifecycle().get_item_durations(order_items)
+        ship['seller_id'] = order_items['seller_id']
+        ship = ship[ship['order_status'] == 'delivered']
+
+        days = {
+            'delay_to_carrier': ship['delay_vs_shipping_limit'],
+            'wait_time': ship['wait_time']
+        }
+
+        # Sketches ignore NaN: sellers without any value get NaN, as in groupby
+        seller_ids = np.sort(ship['seller_id'].dropna().unique())
+        result = []
+        for name, values in days.items():
+            if approx:
+                df = QuantileSketch(relative_error)\
+                    .update(ship['seller_id'], values)\
+                    .quantile(quantiles)\
+                    .reindex(seller_ids)
+            else:
+                df = values.groupby(ship['seller_id'])\
+                    .quantile(list(quantiles), interpolation='lower').unstack()
+            df.columns = [f"{name}_p{round(q * 100)}" for q in df.columns]
+            result.append(df)
+        return pd.concat(result, axis=1).rename_axis('seller_id').reset_index()
+
     def get_active_dates(self):
         """
         Returns a DataFrame with:
@@ -91,8 +102,6 @@ class Seller:
                                                    'order_id', 'seller_id',
                                                    'order_approved_at'
                                                ]].drop_duplicates()
-        orders_sellers["order_approved_at"] = pd.to_datetime(
-            orders_sellers["order_approved_at"])
 
         # Compute dates
         orders_sellers["date_first_sale"] = orders_sellers["order_approved_at"]
@@ -101,21 +110,41 @@ class Seller:
             "date_first_sale": min,
             "date_last_sale": max
         })
+        # Average month length (np.timedelta64(1, 'M') is no longer supported)
         df['months_on_olist'] = round(
             (df['date_last_sale'] - df['date_first_sale']) /
-            np.timedelta64(1, 'M'))
+            np.timedelta64(2629746, 's'))
         return df
 
-    def get_quantity(self):
+    def get_cohorts(self):
+        """
+        Returns the Cohort of sellers by month of first sale (approved
+        orders, as get_active_dates), with sales (price) as values:
+        see get_retention and get_value_retention of olist/cohort.py
+        """
+        order_items = self.data['order_items']
+        orders = self.data['orders']
+        positions = pd.Index(orders['order_id']).get_indexer(order_items['order_id'])
+        approved = orders['order_approved_at'].to_numpy()[positions]
+        approved[positions < 0] = np.datetime64('NaT')
+        return Cohort(order_items['seller_id'], approved, order_items['price'])
+
+    def get_quantity(self, approx=False, error=0.01):
         """
         Returns a DataFrame with:
         'seller_id', 'n_orders', 'quantity', 'quantity_per_order'
+        with n_orders estimated by HyperLogLog (relative `error`) if approx
         """
         order_items = self.data['order_items']
 
-        n_orders = order_items.groupby('seller_id')['order_id']\
-            .nunique()\
-            .reset_index()
+        if approx:
+            n_orders = HyperLogLog(error)\
+                .update(order_items['seller_id'], order_items['order_id'])\
+                .estimate().round().astype(int).reset_index()
+        else:
+            n_orders = order_items.groupby('seller_id')['order_id']\
+                .nunique()\
+                .reset_index()
         n_orders.columns = ['seller_id', 'n_orders']
 
         quantity = order_items.groupby('seller_id', as_index=False).agg(
@@ -141,18 +170,10 @@ class Seller:
         Returns a DataFrame with:
         'seller_id', 'share_of_five_stars', 'share_of_one_stars', 'review_score'
         """
-        temp = pd.merge(left=self.data['order_items'], right=self.data['order_reviews'], on="order_id").drop([
-                        "order_id",
-                        "order_item_id",
-                        "product_id",
-                        "shipping_limit_date",
-                        "price",
-                        "freight_value",
-                        "review_id",
-                        "review_comment_title",
-                        "review_comment_message",
-                        "review_creation_date",
-                        "review_answer_timestamp"], axis=1)
+        # Project the needed columns before merging
+        temp = pd.merge(left=self.data['order_items'][['order_id', 'seller_id']],
+                        right=self.data['order_reviews'][['order_id', 'review_score']],
+                        on="order_id").drop("order_id", axis=1)
 
         temp["share_of_five_stars"] = temp["review_score"] == 5
         temp["share_of_one_stars"] = temp["review_score"] == 1
@@ -193,7 +214,7 @@ class Seller:
                         self.data['order_items'][["order_id", "seller_id"]], on="order_id")
         cost["review_cost"] = cost["review_score"].agg(review_cost)
 
-        cost = cost.groupby("seller_id").sum().drop("review_score", axis=1)
+        cost = cost.groupby("seller_id")[["review_cost"]].sum()
 
         cost["revenue"] = round(self.get_active_dates()["months_on_olist"] * monthly_charge\
             + self.get_sales()["sales"] * 0.10, 2) # 10% cut from the sales
@@ -214,24 +235,118 @@ class Seller:
         'quantity_per_order', 'sales', 'revenue', 'total_review_cost', 'profits']
         """
 
-        training_set =\
-            self.get_seller_features()\
-                .merge(
-                self.get_seller_delay_wait_time(), on='seller_id'
-               ).merge(
-                self.get_active_dates(), on='seller_id'
-               ).merge(
-                self.get_quantity(), on='seller_id'
-               ).merge(
-                self.get_sales(), on='seller_id'
-               )
-
-        if self.get_review_score() is not None:
-            training_set = training_set.merge(
-                self.get_review_score(), on='seller_id').merge(
-                    self.get_revenue_cost(), on='seller_id')
-
-        return training_set
+        features = [
+            self.get_seller_features(),
+            self.get_seller_delay_wait_time(),
+            self.get_active_dates(),
+            self.get_quantity(),
+            self.get_sales()
+        ]
+
+        review_score = self.get_review_score()
+        if review_score is not None:
+            features += [review_score, self.get_revenue_cost()]
+
+        # Inner join on seller_id by binary search, columns assembled once
+        return join_frames(features, on='seller_id')
+
+    def get_indexes(self):
+        """
+        Returns a dict of KeyIndex on 'sellers' and 'order_items' keyed by
+        seller_id (built on first call), plus the order_id indexes of
+        Order.get_indexes
+        """
+        if self._indexes is None:
+            order_items = self.data['order_items']
+            order_items = pd.DataFrame({
+                'seller_id': order_items['seller_id'],
+                'order_id': order_items['order_id'],
+                'price': order_items['price'],
+                'shipping_limit': to_days(*to_epoch(order_items['shipping_limit_date']))
+            })
+            self._indexes = {
+                'sellers': KeyIndex(self.get_seller_features(), 'seller_id'),
+                'order_items': KeyIndex(order_items, 'seller_id'),
+                **{f"order_{name}": index
+                   for name, index in self.order.get_indexes().items()}
+            }
+        return self._indexes
+
+    def _get_features(self, seller_id):
+        """
+        Returns a dict with the columns of `get_training_data` for one
+        `seller_id` (None if unknown), only touching the rows of this seller
+        and of its orders
+        """
+        indexes = self.get_indexes()
+        seller = indexes['sellers'].get(seller_id)
+        items = indexes['order_items'].get(seller_id)
+        if len(seller['seller_city']) == 0 or len(items['order_id']) == 0:
+            return None
+
+        # Orders of each item
+        orders = indexes['order_orders'].columns
+        positions = indexes['order_orders'].find(items['order_id'])
+        known = positions >= 0
+        positions = positions[known]
+
+        # Delay and wait time on delivered orders
+        delivered = orders['order_status'][positions] == 'delivered'
+
+        def mean(days):
+            days = days[delivered]
+            days = days[~np.isnan(days)]
+            return days.mean() if len(days) else np.nan
+
+        delay = mean(orders['carrier'][positions] - items['shipping_limit'][known])
+        wait_time = mean(orders['delivered'][positions] - orders['purchase'][positions])
+
+        # Active dates on approved orders
+        approved = np.unique(orders['approved'][np.unique(positions)])
+        approved = approved[~np.isnan(approved)]
+        if len(approved):
+            date_first_sale, date_last_sale = approved[0], approved[-1]
+            months_on_olist = round((date_last_sale - date_first_sale) / 30.436875)
+        else:
+            date_first_sale = date_last_sale = months_on_olist = np.nan
+
+        # One row per (item, review) as in get_review_score
+        _, reviews = indexes['order_order_reviews'].get_many(items['order_id'])
+        scores = reviews['review_score']
+        review_cost = np.select([scores == 1, scores == 2, scores == 3],
+                                [100, 50, 40], 0).sum()
+
+        n_orders = len(np.unique(items['order_id']))
+        sales = items['price'].sum()
+        revenue = round(months_on_olist * 80 + sales * 0.10, 2)
+
+        def share(mask):
+            return mask.mean() if len(scores) else np.nan
+
+        def to_timestamp(days):
+            # Olist timestamps are to the second
+            return pd.Timestamp(round(days * 24 * 3600), unit='s') if days == days else pd.NaT
+
+        return {
+            'seller_id': seller_id,
+            'seller_city': seller['seller_city'][0],
+            'seller_state': seller['seller_state'][0],
+            'delay_to_carrier': delay if delay > 0 else 0,
+            'wait_time': wait_time,
+            'date_first_sale': to_timestamp(date_first_sale),
+            'date_last_sale': to_timestamp(date_last_sale),
+            'months_on_olist': months_on_olist,
+            'n_orders': n_orders,
+            'quantity': len(items['order_id']),
+            'quantity_per_order': len(items['order_id']) / n_orders,
+            'sales': sales,
+            'share_of_five_stars': share(scores == 5),
+            'share_of_one_stars': share(scores == 1),
+            'review_score': share(scores),
+            'revenue': revenue,
+            'review_cost': review_cost,
+            'profits': revenue - review_cost
+        }
 
 
 def main():
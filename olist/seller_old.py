@@ -100,9 +100,10 @@ class Seller:
             "date_first_sale": min,
             "date_last_sale": max
         })
+        # Average month length (np.timedelta64(1, 'M') is no longer supported)
         df['months_on_olist'] = round(
             (df['date_last_sale'] - df['date_first_sale']) /
-            np.timedelta64(1, 'M'))
+            np.timedelta64(2629746, 's'))
         return df
 
     def get_quantity(self):
@@ -0,0 +1,224 @@
+"""
+Local HTTP service answering batched seller, order and product feature
+requests from in-memory indexes, so that internal tools do not need to
+import pandas and load the csv files.
+
+    python -m olist.server --port 8000
+
+    POST /features {"seller_id": [...], "order_id": [...], "product_id": [...]}
+    GET  /metrics
+    GET  /health
+"""
+import argparse
+import asyncio
+import collections
+import json
+import math
+import sys
+import time
+import traceback
+import numpy as np
+import pandas as pd
+from olist.data import Olist
+from olist.product import Product
+from olist.seller import Seller
+
+MAX_BODY_SIZE = 10 * 1024 * 1024
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 413: 'Payload Too Large'}
+
+
+def _to_json(value):
+    # NumPy scalars, timestamps and NaN are not JSON serializable
+    if isinstance(value, (np.integer, np.bool_)):
+        return value.item()
+    if isinstance(value, (float, np.floating)):
+        return None if math.isnan(value) else float(value)
+    if value is pd.NaT:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value
+
+
+class FeatureStore:
+    """
+    Features of all sellers, orders and products, loaded once:
+    sellers and orders through their sorted-key indexes, products
+    precomputed as a dict keyed by product_id
+    """
+    def __init__(self):
+        self.snapshot = Olist().get_snapshot()
+        self.seller = Seller()
+        self.seller.get_indexes()
+        products = Product().get_training_data()
+        self.products = dict(zip(products['product_id'],
+                                 products.to_dict(orient='records')))
+
+    def get(self, kind, key):
+        if kind == 'seller_id':
+            features = self.seller.get_features(key)
+        elif kind == 'order_id':
+            features = self.seller.order.get_features(key)
+        else:
+            features = self.products.get(key)
+        if features is None:
+            return None
+        return {name: _to_json(value) for name, value in features.items()}
+
+
+class FeatureServer:
+    """
+    asyncio HTTP/1.1 server (keep-alive) in front of a FeatureStore,
+    reloaded in the background whenever the csv snapshot changes
+    """
+    def __init__(self, host='127.0.0.1', port=8000, reload_interval=5):
+        self.host = host
+        self.port = port
+        self.reload_interval = reload_interval
+        self.store = FeatureStore()
+        self.started_at = time.time()
+        self.n_requests = 0
+        self.n_keys = 0
+        self.n_reloads = 0
+        self.n_reload_errors = 0
+        self.failed_snapshot = None
+        self.latencies = collections.deque(maxlen=10000)
+
+    def get_metrics(self):
+        """
+        Returns a dict of latency (ms) and throughput metrics
+        """
+        uptime = time.time() - self.started_at
+        latencies = np.array(self.latencies) * 1000
+        metrics = {
+            'uptime_s': uptime,
+            'n_requests': self.n_requests,
+            'n_keys': self.n_keys,
+            'n_reloads': self.n_reloads,
+            'n_reload_errors': self.n_reload_errors,
+            'requests_per_s': self.n_requests / uptime,
+            'keys_per_s': self.n_keys / uptime
+        }
+        if len(latencies):
+            for name, q in [('p50', 50), ('p90', 90), ('p99', 99)]:
+                metrics[f"latency_{name}_ms"] = float(np.percentile(latencies, q))
+            metrics['latency_max_ms'] = float(latencies.max())
+        return metrics
+
+    def get_features(self, body):
+        request = json.loads(body or b'{}')
+        if not isinstance(request, dict):
+            raise ValueError("body must be a JSON object")
+        result = {}
+        for kind in ['seller_id', 'order_id', 'product_id']:
+            keys = request.get(kind, [])
+            if not isinstance(keys, list):
+                raise ValueError(f"{kind} must be a list of keys")
+            self.n_keys += len(keys)
+            result[kind] = {key: self.store.get(kind, key) for key in keys}
+        return result
+
+    def route(self, method, path, body):
+        if path == '/features':
+            if method != 'POST':
+                return 405, {'error': 'use POST'}
+            try:
+                return 200, self.get_features(body)
+            except (ValueError, AttributeError, TypeError) as e:
+                return 400, {'error': str(e)}
+        if path == '/metrics':
+            return 200, self.get_metrics()
+        if path == '/health':
+            return 200, {'status': 'ok', 'snapshot': len(self.store.snapshot)}
+        return 404, {'error': f"unknown path {path}"}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_SIZE:
+                    status, payload, body = 413, {'error': 'body too large'}, b''
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    start = time.perf_counter()
+                    status, payload = self.route(method, path, body)
+                    if path == '/features':
+                        self.latencies.append(time.perf_counter() - start)
+                self.n_requests += 1
+
+                content = json.dumps(payload).encode()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(content)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    .encode() + content)
+                await writer.drain()
+                if not keep_alive or status == 413:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def reload(self):
+        """
+        Reloads the store in a worker thread if the csv files changed, then
+        swaps it atomically. On failure the current store keeps serving, and
+        the same snapshot is not retried until the files change again
+        """
+        loop = asyncio.get_running_loop()
+        snapshot = None
+        try:
+            snapshot = await loop.run_in_executor(None, Olist().get_snapshot)
+            if snapshot in (self.store.snapshot, self.failed_snapshot):
+                return
+            self.store = await loop.run_in_executor(None, FeatureStore)
+            self.n_reloads += 1
+        except Exception:  # pylint: disable=broad-except
+            self.failed_snapshot = snapshot
+            self.n_reload_errors += 1
+            print("Reload failed, still serving the previous features:\n"
+                  f"{traceback.format_exc()}", file=sys.stderr)
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            await self.reload()
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        print(f"Serving olist features on http://{self.host}:{self.port}")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.watch())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--reload-interval', type=float, default=5,
+                        help="seconds between two checks of the csv files")
+    args = parser.parse_args()
+    server = FeatureServer(args.host, args.port, args.reload_interval)
+    asyncio.run(server.serve())
+
+
+if __name__ == "__main__":
+    main()
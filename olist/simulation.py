@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from olist.seller import Seller
+
+
+def simulate_profits(months_on_olist,
+                     sales,
+                     n_orders,
+                     review_counts,
+                     monthly_fee=80,
+                     sales_cut=0.10,
+                     review_costs=(100, 50, 40, 0, 0),
+                     it_costs=500000):
+    """
+    Returns a DataFrame with:
+    'n_sellers_removed', 'n_orders', 'revenue', 'review_cost', 'it_cost', 'profits'
+    one row per number of worst sellers removed (0 to n_sellers - 1).
+    `review_counts` is a (n_sellers, 5) array of reviews with 1 to 5 stars.
+    """
+    revenue = months_on_olist * monthly_fee + sales * sales_cut
+    review_cost = review_counts @ np.asarray(review_costs, dtype=float)
+
+    # Worst sellers first, given the parameters of this run
+    order = np.argsort(revenue - review_cost, kind='stable')
+
+    # Totals left after removing the n first sellers, for all n at once
+    def remaining(values):
+        values = values[order]
+        removed = np.concatenate([[0], np.cumsum(values)[:-1]])
+        return values.sum() - removed
+
+    revenue_left = remaining(revenue)
+    review_cost_left = remaining(review_cost)
+    n_orders_left = remaining(n_orders.astype(float))
+
+    # IT costs are proportional to sqrt(n_orders), calibrated on all sellers
+    it_cost_left = it_costs * np.sqrt(n_orders_left / n_orders.sum())
+
+    return pd.DataFrame({
+        'n_sellers_removed': np.arange(len(order)),
+        'n_orders': n_orders_left,
+        'revenue': revenue_left,
+        'review_cost': review_cost_left,
+        'it_cost': it_cost_left,
+        'profits': revenue_left - review_cost_left - it_cost_left
+    })
+
+
+def _simulate_params(args):
+    # Module-level so that it can be pickled by ProcessPoolExecutor
+    arrays, params = args
+    result = simulate_profits(*arrays, **params)
+    for key, value in params.items():
+        result[key] = [value] * len(result)
+    return result
+
+
+class SellerSimulation:
+    """
+    What-if analysis of Olist profits when removing the worst sellers.
+    Per-seller components are computed once, so that profits for every
+    number of sellers removed come out of a single vectorized pass.
+    """
+    def __init__(self, seller=None):
+        # Re-use an existing Seller instance to avoid loading data twice
+        self.seller = seller if seller is not None else Seller()
+        self.components = self.get_components()
+
+    def get_review_counts(self):
+        """
+        Returns a DataFrame with:
+        'seller_id', 'count_of_one_star', 'count_of_two_star',
+        'count_of_three_star', 'count_of_four_star', 'count_of_five_star'
+        """
+        data = self.seller.data
+
+        # Same join as Seller.get_revenue_cost, so default costs match
+        reviews = data['orders'][['order_id']].dropna().merge(
+            data['order_reviews'][['order_id', 'review_score']],
+            on='order_id').merge(data['order_items'][['order_id', 'seller_id']],
+                                 on='order_id')
+
+        counts = reviews.groupby(['seller_id', 'review_score']).size()\
+            .unstack(fill_value=0)\
+            .reindex(columns=[1, 2, 3, 4, 5], fill_value=0)
+        counts.columns = [
+            'count_of_one_star', 'count_of_two_star', 'count_of_three_star',
+            'count_of_four_star', 'count_of_five_star'
+        ]
+        return counts.reset_index()
+
+    def get_components(self):
+        """
+        Returns a DataFrame with:
+        'seller_id', 'months_on_olist', 'sales', 'n_orders', and the
+        review counts from `get_review_counts`
+        """
+        components = self.get_review_counts()\
+            .merge(
+                self.seller.get_active_dates()[['months_on_olist']].reset_index(),
+                on='seller_id'
+            ).merge(
+                self.seller.get_sales().reset_index(), on='seller_id'
+            ).merge(
+                self.seller.get_quantity()[['seller_id', 'n_orders']],
+                on='seller_id')
+        return components
+
+    def _arrays(self):
+        components = self.components
+        return (components['months_on_olist'].to_numpy(dtype=float),
+                components['sales'].to_numpy(dtype=float),
+                components['n_orders'].to_numpy(dtype=float),
+                components.filter(like='count_of_').to_numpy(dtype=float))
+
+    def get_profits(self, **params):
+        """
+        Returns a DataFrame with:
+        'n_sellers_removed', 'n_orders', 'revenue', 'review_cost', 'it_cost', 'profits'
+        `params` are passed to `simulate_profits`
+        (monthly_fee, sales_cut, review_costs, it_costs)
+        """
+        return simulate_profits(*self._arrays(), **params)
+
+    def run_grid(self, grid, n_jobs=None):
+        """
+        Returns the concatenation of `get_profits` for each dict of
+        parameters in `grid`, with one column per parameter.
+        Runs in parallel over `n_jobs` processes unless n_jobs=1.
+        """
+        arrays = self._arrays()
+        tasks = [(arrays, dict(params)) for params in grid]
+
+        if n_jobs == 1:
+            results = [_simulate_params(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                results = list(executor.map(_simulate_params, tasks))
+
+        return pd.concat(results, ignore_index=True)
@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+
+# 2 ** 0, 2 ** 1, ..., 2 ** 63, to compute exact bit lengths of uint64
+POWERS_OF_TWO = np.left_shift(np.uint64(1), np.arange(64, dtype=np.uint64))
+
+
+class GroupedSketch:
+    """
+    Mergeable sketches for many groups at once, stored sparsely as
+    (group code, bucket key, value) triples sorted by group then key.
+    Sketches built on different chunks or processes can be merged.
+    """
+    # Reduction of the values of duplicate (group, key) pairs, and its identity
+    reduce = np.add
+    identity = 0.0
+
+    def __init__(self):
+        self.groups = pd.Index([])
+        self.codes = np.array([], dtype=np.int64)
+        self.keys = np.array([], dtype=np.int64)
+        self.values = np.array([], dtype=float)
+
+    def _add(self, groups, keys, values):
+        # Existing groups keep their codes: new ones are appended
+        new_codes, new_groups = pd.factorize(np.asarray(groups))
+        if len(self.groups):
+            self.groups = self.groups.append(pd.Index(new_groups)).unique()
+        else:
+            self.groups = pd.Index(new_groups)
+        codes = self.groups.get_indexer(new_groups)[new_codes]
+        codes = np.concatenate([self.codes, codes])
+        keys = np.concatenate([self.keys, np.asarray(keys, dtype=np.int64)])
+        values = np.concatenate([self.values, values])
+        if not len(values):
+            return
+
+        # Reduce duplicate (group, key) pairs: hash a single int64 code per
+        # pair, reduce values in place, then only sort the distinct pairs
+        min_key = keys.min()
+        span = keys.max() - min_key + 1
+        pair_codes, pairs = pd.factorize(codes * span + (keys - min_key))
+        reduced = np.full(len(pairs), self.identity)
+        self.reduce.at(reduced, pair_codes, values)
+        order = np.argsort(pairs)
+        self.codes = pairs[order] // span
+        self.keys = pairs[order] % span + min_key
+        self.values = reduced[order]
+
+    def merge(self, other):
+        """
+        Merges `other` (a sketch of the same type and parameters) into self
+        """
+        self._add(other.groups[other.codes], other.keys, other.values)
+        return self
+
+
+class HyperLogLog(GroupedSketch):
+    """
+    HyperLogLog distinct counts per group, with a relative standard
+    error of about `error` (1.04 / sqrt(number of registers))
+    """
+    reduce = np.maximum
+    identity = -np.inf
+
+    def __init__(self, error=0.01):
+        super().__init__()
+        self.p = int(np.clip(np.ceil(np.log2((1.04 / error) ** 2)), 4, 18))
+
+    def update(self, groups, values):
+        """
+        Adds `values` to the distinct count of their `groups`. Values are
+        hashed in their own dtype: merged sketches must be built on values
+        of the same dtype (e.g. int64 ids, or strings)
+        """
+        hashes = pd.util.hash_array(np.asarray(values))
+        registers = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        remainder = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        # Position of the leftmost 1-bit in the remaining 64 - p bits
+        bit_length = np.searchsorted(POWERS_OF_TWO, remainder, side='right')
+        ranks = (64 - self.p) - bit_length + 1
+        self._add(groups, registers, ranks.astype(float))
+        return self
+
+    def estimate(self):
+        """
+        Returns a Series of estimated distinct counts, indexed by sorted groups
+        """
+        m = 2 ** self.p
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        n_groups = len(self.groups)
+
+        # Empty registers count as 2 ** 0 in the harmonic mean
+        n_filled = np.bincount(self.codes, minlength=n_groups)
+        harmonic = np.bincount(self.codes, weights=2.0 ** -self.values,
+                               minlength=n_groups) + (m - n_filled)
+        estimate = alpha * m ** 2 / harmonic
+
+        # Linear counting for small cardinalities
+        n_empty = m - n_filled
+        small = (estimate <= 2.5 * m) & (n_empty > 0)
+        estimate[small] = m * np.log(m / n_empty[small])
+        return pd.Series(estimate, index=self.groups).sort_index()
+
+
+class QuantileSketch(GroupedSketch):
+    """
+    Quantiles per group with a relative error of at most `relative_error`
+    on the returned values (logarithmic buckets, as in DDSketch).
+    The quantile q of n values is the lower order statistic of rank
+    q * (n - 1), as np.quantile(..., method='lower'): sketches do not
+    interpolate between values
+    """
+    # Offset of bucket keys so that their sign gives the sign of values
+    OFFSET = 1 << 20
+
+    def __init__(self, relative_error=0.01, min_value=1e-9):
+        super().__init__()
+        self.gamma = (1 + relative_error) / (1 - relative_error)
+        self.min_value = min_value
+
+    def update(self, groups, values):
+        """
+        Adds `values` (NaN are ignored) to the distribution of their `groups`
+        """
+        values = np.asarray(values, dtype=float)
+        known = ~np.isnan(values)
+        groups, values = np.asarray(groups)[known], values[known]
+
+        # Keys sort in the same order as the values they represent
+        magnitude = np.abs(values)
+        keys = np.zeros(len(values), dtype=np.int64)
+        nonzero = magnitude > self.min_value
+        keys[nonzero] = np.sign(values[nonzero]) * (
+            np.ceil(np.log(magnitude[nonzero]) / np.log(self.gamma)) + self.OFFSET)
+        self._add(groups, keys, np.ones(len(values)))
+        return self
+
+    def quantile(self, quantiles=(0.5, 0.9)):
+        """
+        Returns a DataFrame with sorted groups as index and one column per
+        quantile (lower order statistics, see the class docstring)
+        """
+        n_groups = len(self.groups)
+        counts = np.cumsum(self.values)
+        totals = np.bincount(self.codes, weights=self.values, minlength=n_groups)
+        before = np.cumsum(totals) - totals
+
+        # Bucket value: middle of [gamma ** (k - 1), gamma ** k]
+        magnitude = np.abs(self.keys) - self.OFFSET
+        bucket_values = np.where(
+            self.keys == 0, 0,
+            np.sign(self.keys) * 2 * self.gamma ** magnitude / (self.gamma + 1))
+
+        result = {}
+        for q in np.atleast_1d(quantiles):
+            # First bucket of each group whose cumulative count exceeds the rank
+            ranks = before + q * (totals - 1)
+            positions = np.searchsorted(counts, ranks, side='right')
+            result[q] = bucket_values[np.minimum(positions, len(counts) - 1)]
+        return pd.DataFrame(result, index=self.groups).sort_index()
@@ -0,0 +1,195 @@
+import hashlib
+import os
+import pickle
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+from olist.data import get_olist
+from olist.geolocation import Geolocation
+
+EARTH_RADIUS_KM = 6371
+
+# Part of the disk cache key: bump it when the way trees are built changes
+CACHE_VERSION = 1
+
+
+def to_unit_vectors(lat, lng):
+    """
+    Returns the (n, 3) array of points on the unit sphere of
+    coordinates `lat`, `lng` (in degrees)
+    """
+    lat, lng = np.radians(lat), np.radians(lng)
+    return np.column_stack([np.cos(lat) * np.cos(lng),
+                            np.cos(lat) * np.sin(lng),
+                            np.sin(lat)])
+
+
+def chord_to_km(chord):
+    # Straight-line distance between unit vectors -> great-circle distance
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+def km_to_chord(km):
+    return 2 * np.sin(np.minimum(km / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+class SpatialIndex:
+    """
+    Sellers indexed by location (zip code prefix coordinates) to answer
+    batched k-nearest and radius queries, e.g. the nearest seller of each
+    customer. Points are stored as 3D unit vectors in a KD-tree: the
+    euclidean (chord) distance is monotonic in the haversine distance, so
+    queries are exact. Built trees are cached in memory and on disk.
+    `geolocation_params` are passed to Geolocation (e.g. cell_size).
+    """
+    def __init__(self, olist=None, cache_dir=None, **geolocation_params):
+        self.olist = get_olist(olist)
+        self.data = self.olist.get_data()
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(self.olist.get_csv_path()), 'cache')
+        self.cache_dir = cache_dir
+        self.geolocation = Geolocation(self.olist, cache_dir=cache_dir, **geolocation_params)
+        self._trees = {}
+
+    def get_zip_locations(self):
+        """
+        Returns a DataFrame indexed by 'geolocation_zip_code_prefix' with:
+        'geolocation_lat', 'geolocation_lng'
+        (cleaned centroids of each prefix, as in Order.get_distance_seller_customer)
+        """
+        locations = self.geolocation.get_locations()
+        return locations.set_index('geolocation_zip_code_prefix')[[
+            'geolocation_lat', 'geolocation_lng'
+        ]]
+
+    def get_locations(self, name):
+        """
+        Returns a DataFrame with:
+        'customer_id' or 'seller_id', 'lat', 'lng'
+        for `name` in ('customers', 'sellers'), NaN for unknown zip code prefixes
+        """
+        key = name[:-1]
+        df = self.data[name]
+        locations = self.get_zip_locations().reindex(df[f"{key}_zip_code_prefix"])
+        return pd.DataFrame({
+            f"{key}_id": df[f"{key}_id"].to_numpy(),
+            'lat': locations['geolocation_lat'].to_numpy(),
+            'lng': locations['geolocation_lng'].to_numpy()
+        })
+
+    def get_seller_ids(self, category=None):
+        """
+        Returns the array of seller_ids that sold at least one product
+        of `category` (English name, as in Product), or all sellers
+        """
+        if category is None:
+            return self.data['sellers']['seller_id'].unique()
+        products = self.data['products'].merge(
+            self.data['product_category_name_translation'], on='product_category_name')
+        product_ids = products.loc[
+            products['product_category_name_english'] == category, 'product_id']
+        order_items = self.data['order_items']
+        return order_items.loc[order_items['product_id'].isin(product_ids),
+                               'seller_id'].unique()
+
+    def _get_cache_path(self, category):
+        # Trees depend on the cleaned locations: their key covers the snapshot
+        key = repr((CACHE_VERSION, self.geolocation.get_cache_key(), category))
+        digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"sellers_{digest}.pkl")
+
+    def get_tree(self, category=None):
+        """
+        Returns (seller_ids, tree): the KD-tree of the located sellers
+        (of `category` if given), loaded from the disk cache when the
+        csv files did not change
+        """
+        if category in self._trees:
+            return self._trees[category]
+
+        path = self._get_cache_path(category)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                self._trees[category] = pickle.load(f)
+            return self._trees[category]
+
+        sellers = self.get_locations('sellers').dropna()
+        sellers = sellers[sellers['seller_id'].isin(self.get_seller_ids(category))]
+        tree = cKDTree(to_unit_vectors(sellers['lat'], sellers['lng']))
+        self._trees[category] = (sellers['seller_id'].to_numpy(), tree)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump(self._trees[category], f)
+        return self._trees[category]
+
+    def query_nearest(self, lat, lng, k=1, category=None):
+        """
+        Returns (distances, seller_ids): two (n, k) arrays with the
+        haversine distance (km) to and the id of the k nearest sellers of
+        each point, NaN and None for missing points or too few sellers
+        """
+        seller_ids, tree = self.get_tree(category)
+        points = to_unit_vectors(lat, lng)
+        known = ~np.isnan(points).any(axis=1)
+
+        distances = np.full((len(points), k), np.nan)
+        ids = np.full((len(points), k), None, dtype=object)
+        if known.any() and len(seller_ids):
+            chords, positions = tree.query(points[known], k=k, workers=-1)
+            chords, positions = chords.reshape(-1, k), positions.reshape(-1, k)
+            # Missing neighbours have an infinite distance and position n
+            found = positions < len(seller_ids)
+            distances[known] = np.where(found, chord_to_km(chords), np.nan)
+            ids[known] = np.where(found, seller_ids[np.minimum(positions, len(seller_ids) - 1)],
+                                  None)
+        return distances, ids
+
+    def query_radius(self, lat, lng, radius_km, category=None, count_only=False):
+        """
+        Returns, for each point, the array of seller_ids within `radius_km`
+        (km), or only their number if `count_only` (NaN for missing points)
+        """
+        seller_ids, tree = self.get_tree(category)
+        points = to_unit_vectors(lat, lng)
+        known = ~np.isnan(points).any(axis=1)
+
+        matches = tree.query_ball_point(points[known], km_to_chord(radius_km),
+                                        workers=-1, return_length=count_only)
+        if count_only:
+            counts = np.full(len(points), np.nan)
+            counts[known] = matches
+            return counts
+        # Filled one by one: numpy would broadcast arrays of equal lengths
+        result = np.empty(len(points), dtype=object)
+        for i in range(len(points)):
+            result[i] = seller_ids[:0]
+        for i, positions in zip(np.flatnonzero(known), matches):
+            result[i] = seller_ids[positions]
+        return result
+
+    def get_nearest_seller(self, category=None):
+        """
+        Returns a DataFrame with:
+        'customer_id', 'nearest_seller_id', 'distance_nearest_seller'
+        """
+        customers = self.get_locations('customers')
+        distances, ids = self.query_nearest(customers['lat'], customers['lng'],
+                                            category=category)
+        return pd.DataFrame({
+            'customer_id': customers['customer_id'],
+            'nearest_seller_id': ids[:, 0],
+            'distance_nearest_seller': distances[:, 0]
+        })
+
+    def get_sellers_within(self, radius_km=100, category=None):
+        """
+        Returns a DataFrame with:
+        'customer_id', 'n_sellers_within_radius'
+        """
+        customers = self.get_locations('customers')
+        return pd.DataFrame({
+            'customer_id': customers['customer_id'],
+            'n_sellers_within_radius': self.query_radius(
+                customers['lat'], customers['lng'], radius_km, category, count_only=True)
+        })
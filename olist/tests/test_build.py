@@ -0,0 +1,22 @@
+import os
+import unittest
+from olist.build import NODES, get_sources
+
+
+class TestFingerprintSources(unittest.TestCase):
+
+    def get_modules(self, name):
+        source, paths = get_sources(NODES[name][1])
+        return {os.path.basename(path)[:-3] for path in paths}
+
+    def test_transitive_imports(self):
+        # order imports geolocation, which imports utils
+        self.assertTrue({'order', 'geolocation', 'utils', 'data', 'lifecycle'}
+                        <= self.get_modules('order_features'))
+        self.assertIn('cohort', self.get_modules('sellers'))
+        self.assertEqual(self.get_modules('geolocation'), {'data', 'geolocation', 'utils'})
+
+    def test_function_source(self):
+        source, _ = get_sources('build_orders')
+        self.assertTrue(source.startswith('def build_orders('))
+        self.assertNotIn('def build_sellers', source)
@@ -0,0 +1,50 @@
+import unittest
+import numpy as np
+import pandas as pd
+from olist.cohort import Cohort
+
+
+class TestCohort(unittest.TestCase):
+
+    def test_missing_keys_are_ignored(self):
+        cohort = Cohort(['a', None, 'b', 'a', np.nan],
+                        ['2018-01-10', '2018-01-20', '2018-03-05', '2018-02-01', '2018-01-02'])
+        sizes = cohort.get_sizes()
+        self.assertEqual(sizes.to_dict(), {pd.Timestamp('2018-01-01'): 1,
+                                           pd.Timestamp('2018-02-01'): 0,
+                                           pd.Timestamp('2018-03-01'): 1})
+        self.assertEqual(cohort.get_active().loc['2018-01-01', 1], 1)
+
+    def test_missing_dates_are_ignored(self):
+        with_missing = Cohort(['a', 'b', 'a'], ['2018-01-10', None, '2018-02-01'], [1, 2, 3])
+        without = Cohort(['a', 'a'], ['2018-01-10', '2018-02-01'], [1, 3])
+        pd.testing.assert_frame_equal(with_missing.get_values(), without.get_values())
+
+    def test_same_as_groupby(self):
+        rng = np.random.default_rng(0)
+        n = 2000
+        keys = rng.choice([f"seller_{i}" for i in range(100)], n)
+        dates = pd.Timestamp('2017-01-01') + pd.to_timedelta(rng.integers(0, 600, n), 'D')
+        values = rng.normal(100, 20, n)
+        cohort = Cohort(keys, dates, values)
+
+        # Reference: month of each event and of the first event of its key
+        events = pd.DataFrame({'key': keys, 'month': dates.to_period('M'), 'value': values})
+        events['cohort'] = events.groupby('key')['month'].transform('min')
+        events['period'] = (events['month'] - events['cohort']).apply(lambda offset: offset.n)
+        events['cohort'] = events['cohort'].dt.to_timestamp()
+
+        active = events.groupby(['cohort', 'period'])['key'].nunique()
+        result = cohort.get_active().stack()
+        pd.testing.assert_series_equal(result[result > 0].astype(int), active,
+                                       check_names=False, check_index_type=False)
+
+        values = events.groupby(['cohort', 'period'])['value'].sum()
+        result = cohort.get_values().stack()
+        pd.testing.assert_series_equal(result.loc[values.index], values,
+                                       check_names=False, check_index_type=False)
+
+        sizes = events.drop_duplicates('key').groupby('cohort').size()
+        result = cohort.get_sizes()
+        pd.testing.assert_series_equal(result[result > 0], sizes,
+                                       check_names=False, check_index_type=False)
@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from olist.data import Olist, copy_on_write, is_copy_on_write, parse_timestamps, read_csv
+
+
+class TestLeanMode(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        pd.DataFrame({'order_id': ['a', 'b'], 'price': [1.0, 2.0]})\
+            .to_csv(os.path.join(self.folder.name, 'olist_order_items_dataset.csv'), index=False)
+        self.csv_path = mock.patch.object(Olist, 'get_csv_path', return_value=self.folder.name)
+        self.csv_path.start()
+
+    def tearDown(self):
+        self.csv_path.stop()
+        self.folder.cleanup()
+
+    def test_option_is_not_changed(self):
+        before = pd.get_option('mode.copy_on_write')
+        Olist(lean=True).get_data()
+        self.assertEqual(pd.get_option('mode.copy_on_write'), before)
+        with copy_on_write():
+            self.assertTrue(is_copy_on_write())
+        self.assertEqual(pd.get_option('mode.copy_on_write'), before)
+
+    def test_deep_copies_without_copy_on_write(self):
+        with mock.patch('olist.data.is_copy_on_write', return_value=False):
+            data = Olist(lean=True).get_data()
+            data['order_items'].loc[0, 'price'] = 100
+            self.assertEqual(Olist().get_data()['order_items'].loc[0, 'price'], 1.0)
+
+    def test_shallow_copies_with_copy_on_write(self):
+        with copy_on_write():
+            first = Olist(lean=True).get_data()['order_items']
+            second = Olist(lean=True).get_data()['order_items']
+            self.assertTrue(np.shares_memory(first['price'].to_numpy(),
+                                             second['price'].to_numpy()))
+            first.loc[0, 'price'] = 100
+            self.assertEqual(second.loc[0, 'price'], 1.0)
+
+
+class TestSamplingError(unittest.TestCase):
+
+    def setUp(self):
+        # 4 orders sampled out of 8 in stratum 'a', 3 out of 30 in stratum 'b'
+        self.olist = Olist(sample=0.5)
+        self.olist.strata = pd.Series(list('aaaabbb'), index=list('0123456'))
+        self.olist.population = pd.Series({'a': 8, 'b': 30})
+        self.df = pd.DataFrame({'order_id': list('0123456'),
+                                'seller_id': list('xxyyzzz'),
+                                'y': [1.0, 2.0, 3.0, 6.0, 10.0, 20.0, 60.0]})
+        get_sample = mock.patch.object(Olist, 'get_sample')
+        get_sample.start()
+        self.addCleanup(get_sample.stop)
+
+    def test_full_domain_is_stratified_estimator(self):
+        stats = self.df.groupby(self.olist.strata[self.df['order_id']].values)['y']\
+            .agg(['mean', 'var', 'count'])
+        shares = self.olist.population / self.olist.population.sum()
+        variance = (shares ** 2 * (1 - stats['count'] / self.olist.population) *
+                    stats['var'] / stats['count']).sum()
+        result = self.olist.get_sampling_error(self.df, 'y')
+        self.assertAlmostEqual(result['mean'], (shares * stats['mean']).sum())
+        self.assertAlmostEqual(result['standard_error'], variance ** 0.5)
+        self.assertEqual(result['n'], 7)
+
+    def test_subdomain_weights_are_estimated(self):
+        # Domain sizes are estimated from the sample: 8 * 2/4 in 'a', 30 * 1/3 in 'b'
+        domain = self.df[self.df['order_id'].isin(['0', '1', '4'])]
+        result = self.olist.get_sampling_error(domain, 'y')
+        self.assertAlmostEqual(result['mean'], (4 * 1.5 + 10 * 10.0) / 14)
+        self.assertGreater(result['standard_error'], 0)
+
+    def test_other_keys_raise(self):
+        with self.assertRaises(ValueError):
+            self.olist.get_sampling_error(self.df, 'y', key='seller_id')
+
+
+class TestParseTimestamps(unittest.TestCase):
+
+    def test_string_dtype(self):
+        with pd.option_context('future.infer_string', True):
+            df = pd.DataFrame({'order_id': ['a', 'b', 'c'],
+                               'order_approved_at': ['2017-01-02 10:00:00', None,
+                                                     '2017-03-04 12:30:00']})
+            self.assertFalse(df['order_approved_at'].dtype == object)
+            df = parse_timestamps(df)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df['order_approved_at']))
+        self.assertTrue(pd.isna(df.loc[1, 'order_approved_at']))
+        self.assertFalse(pd.api.types.is_datetime64_any_dtype(df['order_id']))
+
+    def test_read_csv_with_string_dtype(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'olist_orders_dataset.csv')
+            pd.DataFrame({'order_id': ['a'], 'order_approved_at': ['2017-01-02 10:00:00'],
+                          'order_delivered_carrier_date': [None]}).to_csv(path, index=False)
+            with pd.option_context('future.infer_string', True):
+                df = read_csv(path)
+        self.assertEqual(df.loc[0, 'order_approved_at'], pd.Timestamp('2017-01-02 10:00:00'))
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df['order_delivered_carrier_date']))
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from olist.export import export, read
+
+
+class TestExport(unittest.TestCase):
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.path = os.path.join(folder.name, 'products')
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({
+            'product_id': [f"p{i:02d}" for i in range(60)],
+            'category': rng.choice(['toys', 'garden', 'books'], 60),
+            'price': rng.lognormal(4, 1, 60),
+            'quantity': rng.integers(1, 10, 60)
+        })
+        self.df.loc[5, 'category'] = None
+
+    def export(self, df):
+        with mock.patch('olist.export.get_training_data', return_value=df.copy()):
+            return export('products', self.path, row_group_size=10)
+
+    def read(self, **kwargs):
+        df = read('products', self.path, **kwargs)
+        return df.sort_values('product_id', ignore_index=True)[self.df.columns]
+
+    def test_round_trip(self):
+        self.assertEqual(self.export(self.df), self.path)
+        expected = self.df.fillna({'category': 'unknown'})
+        pd.testing.assert_frame_equal(self.read(), expected)
+        self.assertEqual(sorted(os.listdir(self.path)),
+                         ['category=books', 'category=garden', 'category=toys',
+                          'category=unknown'])
+
+    def test_filters(self):
+        self.export(self.df)
+        df = self.read(filters=[('category', 'in', ['toys', 'books']), ('price', '>', 50)])
+        expected = self.df[self.df['category'].isin(['toys', 'books']) & (self.df['price'] > 50)]
+        pd.testing.assert_frame_equal(df, expected.reset_index(drop=True))
+
+    def test_removed_partition_is_not_read(self):
+        self.export(self.df)
+        kept = self.df[self.df['category'] != 'garden'].reset_index(drop=True)
+        self.export(kept)
+        df = self.read()
+        self.assertNotIn('garden', set(df['category']))
+        pd.testing.assert_frame_equal(df, kept.fillna({'category': 'unknown'}))
+        self.assertNotIn('category=garden', os.listdir(self.path))
+        # No staging folder is left next to the dataset
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ['products'])
@@ -0,0 +1,70 @@
+import unittest
+import numpy as np
+import pandas as pd
+from olist.index import KeyIndex
+from olist.join import join_frames
+
+
+class TestJoinFrames(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        keys = np.array([f"key_{i}" for i in range(50)], dtype=object)
+        # Duplicated, missing and unknown keys, in random order
+        self.frames = [
+            pd.DataFrame({'key': rng.choice(keys[:40], 100), 'a': rng.normal(size=100)}),
+            pd.DataFrame({'key': rng.choice(keys[10:], 80), 'b': rng.integers(0, 5, 80)}),
+            pd.DataFrame({'key': rng.permutation(keys)[:45], 'c': rng.normal(size=45),
+                          'd': rng.choice(['x', 'y'], 45)})
+        ]
+
+    def get_merged(self, frames):
+        merged = frames[0]
+        for frame in frames[1:]:
+            merged = merged.merge(frame, on='key')
+        return merged
+
+    def test_same_as_merge_chain(self):
+        pd.testing.assert_frame_equal(join_frames(self.frames, on='key'),
+                                      self.get_merged(self.frames))
+
+    def test_key_in_index(self):
+        frames = [self.frames[0], self.frames[1].set_index('key'), self.frames[2]]
+        pd.testing.assert_frame_equal(join_frames(frames, on='key'),
+                                      self.get_merged(self.frames))
+
+    def test_no_match(self):
+        frames = [self.frames[0], pd.DataFrame({'key': ['unknown'], 'b': [1]})]
+        result = join_frames(frames, on='key')
+        self.assertEqual(len(result), 0)
+        self.assertEqual(list(result.columns), ['key', 'a', 'b'])
+
+    def test_shared_columns_raise(self):
+        frames = [self.frames[0], self.frames[1].rename(columns={'b': 'a'})]
+        with self.assertRaises(ValueError):
+            join_frames(frames, on='key')
+
+
+class TestKeyIndexLookup(unittest.TestCase):
+
+    def test_lookup_first_row(self):
+        df = pd.DataFrame({'key': ['b', 'a', 'b', 'c']})
+        rows = KeyIndex(df, 'key', columns=[]).lookup(['a', 'b', 'c', 'd'])
+        np.testing.assert_array_equal(rows, [1, 0, 3, -1])
+
+    def test_lookup_empty(self):
+        rows = KeyIndex(pd.DataFrame({'key': []}), 'key', columns=[]).lookup(['a'])
+        np.testing.assert_array_equal(rows, [-1])
+
+    def test_missing_keys_match(self):
+        # As in merge, missing keys match each other
+        df = pd.DataFrame({'key': ['a', None, 'b', np.nan], 'value': [0, 1, 2, 3]})
+        index = KeyIndex(df, 'key')
+        np.testing.assert_array_equal(index.lookup([np.nan, 'b']), [1, 2])
+        np.testing.assert_array_equal(index.get(np.nan)['value'], [1, 3])
+        np.testing.assert_array_equal(index.get('c')['value'], [])
+
+    def test_integer_keys(self):
+        df = pd.DataFrame({'key': [30, 10, 20, 10]})
+        rows = KeyIndex(df, 'key', columns=[]).lookup(np.array([10, 20, -1, 40]))
+        np.testing.assert_array_equal(rows, [1, 2, -1, -1])
@@ -0,0 +1,55 @@
+import unittest
+import numpy as np
+import pandas as pd
+import statsmodels.formula.api as smf
+from olist.model import StreamingFitter
+
+
+class TestStreamingFitter(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 500
+        self.data = pd.DataFrame({
+            'wait_time': rng.gamma(2, 5, n),
+            'price': rng.lognormal(4, 1, n),
+            'order_status': rng.choice(['delivered', 'shipped', 'canceled'], n, p=[0.8, 0.15, 0.05])
+        })
+        linear = 1.5 - 0.1 * self.data['wait_time'] + 0.002 * self.data['price']
+        self.data['review_score'] = linear + rng.normal(size=n)
+        self.data['is_five_star'] = (rng.random(n) < 1 / (1 + np.exp(-linear))).astype(float)
+        # Missing values are dropped from both sides, as in statsmodels
+        self.data.loc[[3, 250], 'wait_time'] = np.nan
+        self.data.loc[[10, 400], 'review_score'] = np.nan
+        # Several chunks, the last one shorter
+        self.fitter = StreamingFitter(self.data, chunk_size=120)
+
+    def assert_same_results(self, results, expected, statistics):
+        for statistic in ['params', 'bse', 'pvalues']:
+            pd.testing.assert_series_equal(getattr(results, statistic),
+                                           getattr(expected, statistic), rtol=1e-6)
+        for statistic in statistics:
+            self.assertAlmostEqual(getattr(results, statistic), getattr(expected, statistic),
+                                   places=6)
+        self.assertEqual(results.nobs, expected.nobs)
+        np.testing.assert_allclose(results.conf_int(alpha=0.1),
+                                   expected.conf_int(alpha=0.1), rtol=1e-6)
+
+    def test_ols(self):
+        formula = 'review_score ~ wait_time + np.log(price) + C(order_status)'
+        self.assert_same_results(self.fitter.fit(formula),
+                                 smf.ols(formula, self.data).fit(),
+                                 ['rsquared', 'ssr', 'df_resid'])
+
+    def test_logit(self):
+        formula = 'is_five_star ~ wait_time + np.log(price) + C(order_status)'
+        results = self.fitter.fit(formula, kind='logit')
+        self.assertTrue(results.converged)
+        self.assert_same_results(results, smf.logit(formula, self.data).fit(disp=0),
+                                 ['llf'])
+
+    def test_chunks_from_function(self):
+        formula = 'review_score ~ wait_time + C(order_status)'
+        chunks = lambda: (self.data.iloc[start:start + 77] for start in range(0, 500, 77))
+        pd.testing.assert_series_equal(StreamingFitter(chunks).fit(formula).params,
+                                       self.fitter.fit(formula).params)
@@ -0,0 +1,91 @@
+import time
+import types
+import unittest
+from unittest import mock
+import pandas as pd
+from olist import registry
+
+
+def make_class(function):
+    return type('Feature', (), {'get_feature': lambda self: function()})
+
+
+def get_feature():
+    return pd.DataFrame({'key': ['a', 'b', 'c'], 'value': [0.5, 1.0, 2.0]})
+
+
+def reference():
+    time.sleep(0.02)
+    return get_feature()
+
+
+# Fake olist modules: implementations of 'test.get_feature'
+MODULES = {
+    'olist.reference': make_class(reference),
+    # Same rows in another order, key as index
+    'olist.fast': make_class(lambda: get_feature().iloc[::-1].set_index('key')),
+    'olist.wrong': make_class(lambda: get_feature().assign(value=[0.5, 1.0, 3.0])),
+    'olist.missing': make_class(lambda: get_feature()[['key']]),
+    'olist.broken': make_class(lambda: 1 / 0),
+}
+
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        patches = [
+            mock.patch.dict(registry.REGISTRY, clear=True),
+            mock.patch.dict(registry._comparisons, clear=True),
+            mock.patch.object(registry.importlib, 'import_module',
+                              lambda name: types.SimpleNamespace(Feature=MODULES[name]))
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def register(self, *names):
+        for name in names:
+            registry.register('test.get_feature', name, name, 'Feature', 'get_feature')
+
+    def test_compare(self):
+        self.register('reference', 'fast', 'wrong', 'missing', 'broken')
+        comparison = registry.compare('test.get_feature', n_repeat=1)
+        self.assertEqual(comparison['conforms'].to_dict(),
+                         {'reference': True, 'fast': True, 'wrong': False,
+                          'missing': False, 'broken': False})
+        self.assertEqual(comparison.loc['wrong', 'different_columns'], ['value'])
+        self.assertAlmostEqual(comparison.loc['wrong', 'max_abs_diff'], 1.0)
+        self.assertEqual(comparison.loc['missing', 'missing_columns'], ['value'])
+        self.assertIn('ZeroDivisionError', comparison.loc['broken', 'error'])
+
+    def test_get_fastest_conforming(self):
+        # 'wrong' is the fastest but does not conform
+        self.register('reference', 'wrong', 'fast')
+        fastest = registry.get_fastest('test.get_feature', n_repeat=1)
+        self.assertIs(type(fastest.__self__), MODULES['olist.fast'])
+        self.assertEqual(fastest().loc['c', 'value'], 2.0)
+
+    def test_register_resets_comparison(self):
+        self.register('reference', 'wrong')
+        fastest = registry.get_fastest('test.get_feature', n_repeat=1)
+        self.assertIs(type(fastest.__self__), MODULES['olist.reference'])
+        self.register('fast')
+        fastest = registry.get_fastest('test.get_feature', n_repeat=1)
+        self.assertIs(type(fastest.__self__), MODULES['olist.fast'])
+
+    def test_unknown_names(self):
+        self.register('reference')
+        with self.assertRaisesRegex(ValueError, 'unknown feature'):
+            registry.compare('test.unknown')
+        with self.assertRaisesRegex(ValueError, 'unknown feature'):
+            registry.get_fastest('test.unknown')
+        with self.assertRaisesRegex(ValueError, "unknown implementation 'other'"):
+            registry.get_implementation('test.get_feature', 'other')
+
+    def test_none_conforms(self):
+        # No output to compare to when the reference fails
+        self.register('broken', 'reference')
+        with self.assertRaisesRegex(ValueError, 'no implementation of test.get_feature '
+                                                'conforms.*ZeroDivisionError'):
+            registry.get_fastest('test.get_feature', n_repeat=1)
+
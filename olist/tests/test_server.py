@@ -0,0 +1,54 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+from olist import server
+
+
+class FakeStore:
+    snapshot = (('olist_orders_dataset.csv', 1, 1),)
+
+    def get(self, kind, key):
+        return {'key': key}
+
+
+class TestFeatureServer(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch.object(server, 'FeatureStore', FakeStore):
+            self.server = server.FeatureServer(reload_interval=0)
+
+    def test_string_keys_are_rejected(self):
+        status, payload = self.server.route('POST', '/features',
+                                            json.dumps({'seller_id': 'abc'}).encode())
+        self.assertEqual(status, 400)
+        self.assertIn('seller_id', payload['error'])
+
+    def test_list_keys(self):
+        status, payload = self.server.route('POST', '/features',
+                                            json.dumps({'seller_id': ['abc']}).encode())
+        self.assertEqual(status, 200)
+        self.assertEqual(payload['seller_id'], {'abc': {'key': 'abc'}})
+
+    def test_failed_reload_keeps_serving(self):
+        store = self.server.store
+        changed = (('olist_orders_dataset.csv', 2, 2),)
+
+        async def watch_once():
+            task = asyncio.ensure_future(self.server.watch())
+            await asyncio.sleep(0.1)
+            done = task.done()
+            task.cancel()
+            return done
+
+        with mock.patch.object(server.Olist, 'get_snapshot', return_value=changed),\
+                mock.patch.object(server, 'FeatureStore',
+                                  side_effect=ValueError('malformed timestamp')) as reload,\
+                mock.patch('sys.stderr'):
+            self.assertFalse(asyncio.run(watch_once()))
+
+        self.assertIs(self.server.store, store)
+        self.assertEqual(self.server.n_reload_errors, 1)
+        # The failed snapshot is not reloaded again until the files change
+        self.assertEqual(reload.call_count, 1)
+        self.assertEqual(self.server.route('GET', '/health', b'')[0], 200)
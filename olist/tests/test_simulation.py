@@ -0,0 +1,58 @@
+import unittest
+import numpy as np
+import pandas as pd
+from olist.simulation import SellerSimulation, simulate_profits
+
+
+def get_components(seed=0, n_sellers=30):
+    rng = np.random.default_rng(seed)
+    components = pd.DataFrame({
+        'seller_id': [f"seller_{i}" for i in range(n_sellers)],
+        'months_on_olist': rng.integers(0, 24, n_sellers).astype(float),
+        'sales': rng.gamma(2, 500, n_sellers),
+        'n_orders': rng.integers(1, 50, n_sellers)
+    })
+    counts = rng.integers(0, 20, (n_sellers, 5))
+    for i, name in enumerate(['one', 'two', 'three', 'four', 'five']):
+        components[f"count_of_{name}_star"] = counts[:, i]
+    return components
+
+
+def get_simulation(seed=0):
+    # Components only: no Seller (and no csv files) needed
+    simulation = SellerSimulation.__new__(SellerSimulation)
+    simulation.components = get_components(seed)
+    return simulation
+
+
+class TestSimulateProfits(unittest.TestCase):
+
+    def test_shape(self):
+        profits = get_simulation().get_profits()
+        self.assertEqual(profits.shape, (30, 6))
+        self.assertEqual(list(profits['n_sellers_removed']), list(range(30)))
+
+    def test_reproducible(self):
+        pd.testing.assert_frame_equal(get_simulation(seed=1).get_profits(sales_cut=0.2),
+                                      get_simulation(seed=1).get_profits(sales_cut=0.2))
+
+    def test_same_as_removing_sellers(self):
+        components = get_components()
+        months, sales = components['months_on_olist'], components['sales']
+        n_orders = components['n_orders'].to_numpy()
+        counts = components.filter(like='count_of_').to_numpy()
+        profits = simulate_profits(months, sales, n_orders, counts)
+
+        # Remove the 5 worst sellers by hand and recompute profits
+        review_cost = counts @ np.array([100, 50, 40, 0, 0])
+        kept = np.argsort(months * 80 + sales * 0.1 - review_cost, kind='stable')[5:]
+        expected = (months * 80 + sales * 0.1 - review_cost)[kept].sum() -\
+            500000 * np.sqrt(n_orders[kept].sum() / n_orders.sum())
+        self.assertAlmostEqual(profits.loc[5, 'profits'], expected)
+
+    def test_grid_in_parallel_as_in_sequence(self):
+        simulation = get_simulation()
+        grid = [{'monthly_fee': fee, 'sales_cut': cut} for fee in [50, 80] for cut in [0.1, 0.2]]
+        sequential = simulation.run_grid(grid, n_jobs=1)
+        self.assertEqual(len(sequential), 4 * 30)
+        pd.testing.assert_frame_equal(simulation.run_grid(grid, n_jobs=2), sequential)
@@ -0,0 +1,125 @@
+import unittest
+import numpy as np
+import pandas as pd
+from olist.seller import Seller
+from olist.sketch import HyperLogLog, QuantileSketch
+
+
+class TestQuantileSketch(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # Small groups (as per seller), negative values and zeros
+        sizes = rng.integers(1, 50, 200)
+        self.groups = np.repeat([f"seller_{i}" for i in range(len(sizes))], sizes)
+        self.values = np.round(rng.normal(2, 10, sizes.sum()), 1)
+        self.quantiles = [0.1, 0.5, 0.9]
+
+    def get_exact(self):
+        return pd.Series(self.values).groupby(self.groups)\
+            .quantile(self.quantiles, interpolation='lower').unstack()
+
+    def assert_within_relative_error(self, approx, exact, relative_error):
+        approx = approx.loc[exact.index, exact.columns].to_numpy()
+        exact = exact.to_numpy()
+        np.testing.assert_array_less(np.abs(approx - exact),
+                                     relative_error * np.abs(exact) + 1e-9)
+
+    def test_matches_exact_lower_quantiles(self):
+        for relative_error in [0.01, 0.05]:
+            approx = QuantileSketch(relative_error)\
+                .update(self.groups, self.values).quantile(self.quantiles)
+            self.assert_within_relative_error(approx, self.get_exact(), relative_error)
+
+    def test_merge_matches_single_sketch(self):
+        half = len(self.values) // 2
+        merged = QuantileSketch()\
+            .update(self.groups[:half], self.values[:half])\
+            .merge(QuantileSketch().update(self.groups[half:], self.values[half:]))
+        single = QuantileSketch().update(self.groups, self.values)
+        pd.testing.assert_frame_equal(merged.quantile(self.quantiles),
+                                      single.quantile(self.quantiles))
+
+    def test_nan_values_are_ignored(self):
+        values = np.append(self.values, np.nan)
+        groups = np.append(self.groups, 'seller_0')
+        pd.testing.assert_frame_equal(
+            QuantileSketch().update(groups, values).quantile(self.quantiles),
+            QuantileSketch().update(self.groups, self.values).quantile(self.quantiles))
+
+
+class InMemoryOlist:
+    """
+    Orders with one item each, sold by a few sellers with 5 to 20 items
+    """
+    def __init__(self):
+        rng = np.random.default_rng(0)
+        n = 300
+        purchase = pd.Timestamp('2018-01-01') + pd.to_timedelta(rng.integers(0, 300, n), 'D')
+        carrier = purchase + pd.to_timedelta(rng.integers(1, 200, n), 'h')
+        delivered = carrier + pd.to_timedelta(rng.integers(24, 600, n), 'h')
+        order_ids = [f"order_{i}" for i in range(n)]
+        self.data = {
+            'orders': pd.DataFrame({
+                'order_id': order_ids,
+                'order_status': 'delivered',
+                'order_purchase_timestamp': purchase,
+                'order_approved_at': purchase,
+                'order_delivered_carrier_date': carrier,
+                'order_delivered_customer_date': delivered,
+                'order_estimated_delivery_date': purchase + pd.Timedelta(15, 'D')
+            }),
+            'order_items': pd.DataFrame({
+                'order_id': order_ids,
+                'seller_id': np.repeat([f"seller_{i}" for i in range(20)], 15),
+                'shipping_limit_date': purchase + pd.Timedelta(3, 'D')
+            })
+        }
+
+    def get_data(self):
+        return {name: df.copy() for name, df in self.data.items()}
+
+
+class TestSellerQuantiles(unittest.TestCase):
+
+    def test_approx_within_relative_error_of_exact(self):
+        seller = Seller(InMemoryOlist())
+        exact = seller.get_delay_wait_time_quantiles().set_index('seller_id')
+        approx = seller.get_delay_wait_time_quantiles(approx=True, relative_error=0.01)\
+            .set_index('seller_id').loc[exact.index]
+        np.testing.assert_array_less((approx - exact).abs().to_numpy(),
+                                     0.01 * exact.abs().to_numpy() + 1e-9)
+
+    def test_sellers_without_values(self):
+        olist = InMemoryOlist()
+        # Orders of seller_0 (its 15 first items) never reached the carrier
+        olist.data['orders'].loc[:14, ['order_delivered_carrier_date',
+                                      'order_delivered_customer_date']] = pd.NaT
+        seller = Seller(olist)
+        exact = seller.get_delay_wait_time_quantiles()
+        approx = seller.get_delay_wait_time_quantiles(approx=True)
+        self.assertEqual(list(approx['seller_id']), list(exact['seller_id']))
+        self.assertTrue(approx.iloc[0, 1:].isna().all())
+
+
+class TestHyperLogLog(unittest.TestCase):
+
+    def test_distinct_counts(self):
+        rng = np.random.default_rng(0)
+        groups = rng.choice(['a', 'b', 'c'], 30000)
+        values = rng.integers(0, 5000, 30000)
+        exact = pd.Series(values).groupby(groups).nunique()
+        estimate = HyperLogLog(0.01).update(groups, values).estimate()
+        np.testing.assert_allclose(estimate.loc[exact.index], exact, rtol=0.05)
+        # Strings are hashed in their own dtype too
+        estimate = HyperLogLog(0.01).update(groups, values.astype(str)).estimate()
+        np.testing.assert_allclose(estimate.loc[exact.index], exact, rtol=0.05)
+
+    def test_merge_matches_single_sketch(self):
+        rng = np.random.default_rng(1)
+        groups = rng.choice(['a', 'b', 'c'], 10000)
+        values = rng.integers(0, 3000, 10000)
+        merged = HyperLogLog().update(groups[:4000], values[:4000])\
+            .merge(HyperLogLog().update(groups[4000:], values[4000:]))
+        pd.testing.assert_series_equal(merged.estimate(),
+                                       HyperLogLog().update(groups, values).estimate())
@@ -0,0 +1,28 @@
+import unittest
+import numpy as np
+from scipy.stats import gaussian_kde
+from olist.utils import binned_kde
+
+
+class TestBinnedKde(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.values = np.concatenate([rng.normal(0, 1, 1500), rng.gamma(2, 2, 500)])
+        self.groups = np.repeat(['a', 'b'], [1500, 500])
+
+    def test_same_as_gaussian_kde(self):
+        grid, densities = binned_kde(self.values)
+        self.assertEqual(densities.shape, (1, 1024))
+        np.testing.assert_allclose(densities.iloc[0].to_numpy(),
+                                   gaussian_kde(self.values)(grid), atol=1e-4)
+
+    def test_groups(self):
+        # Missing values are ignored, each group has its own bandwidth
+        values = np.append(self.values, np.nan)
+        groups = np.append(self.groups, 'b')
+        grid, densities = binned_kde(values, groups)
+        self.assertEqual(list(densities.index), ['a', 'b'])
+        for group in ['a', 'b']:
+            expected = gaussian_kde(self.values[self.groups == group])(grid)
+            np.testing.assert_allclose(densities.loc[group].to_numpy(), expected, atol=1e-4)
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+from olist.data import get_olist
+
+
+class Timeline:
+    """
+    Monthly and rolling-window aggregates per seller (or per product).
+    All (key, month) cells are accumulated in one pass over order_items
+    joined with orders; rolling windows are differences of cumulative sums.
+    """
+    def __init__(self, key='seller_id', olist=None):
+        # key can be 'seller_id' or 'product_id'
+        self.key = key
+        self.data = get_olist(olist).get_data()
+        self.keys, self.months, self.sums = self.get_monthly_sums()
+
+    def get_monthly_sums(self):
+        """
+        Returns (keys, months, sums) where `sums` is a dict of
+        (n_keys, n_months) arrays of additive measures
+        """
+        key = self.key
+        order_items = self.data['order_items'][[
+            'order_id', key, 'price', 'shipping_limit_date'
+        ]]
+        orders = self.data['orders'][[
+            'order_id', 'order_status', 'order_purchase_timestamp',
+            'order_delivered_carrier_date', 'order_delivered_customer_date'
+        ]]
+
+        # One review per order (a few orders have several reviews)
+        reviews = self.data['order_reviews'][['order_id', 'review_score']]
+        reviews = reviews.assign(
+            is_five_star=reviews['review_score'] == 5,
+            is_one_star=reviews['review_score'] == 1)\
+            .groupby('order_id', as_index=False).mean()
+
+        ship = order_items.merge(orders, on='order_id')\
+            .merge(reviews, on='order_id', how='left')
+
+        # Integer codes for keys and months
+        purchase = pd.to_datetime(ship['order_purchase_timestamp'])
+        month = (purchase.dt.year * 12 + purchase.dt.month - 1).to_numpy()
+        key_codes, keys = pd.factorize(ship[key], sort=True)
+        month_codes = month - month.min()
+        n_keys, n_months = len(keys), month_codes.max() + 1
+        cells = key_codes * n_months + month_codes
+
+        def accumulate(weights=None, mask=None):
+            if mask is None:
+                mask = np.ones(len(cells), dtype=bool)
+            if weights is not None:
+                weights = np.asarray(weights, dtype=float)[mask]
+            return np.bincount(cells[mask], weights=weights,
+                               minlength=n_keys * n_months)\
+                .reshape(n_keys, n_months)
+
+        # An order is counted once per key, even with several items
+        first_item = ~ship.duplicated(['order_id', key]).to_numpy()
+        reviewed = first_item & ship['review_score'].notna().to_numpy()
+
+        # Delays are only computed on delivered orders
+        delivered = (ship['order_status'] == 'delivered').to_numpy()
+        delay = (pd.to_datetime(ship['order_delivered_carrier_date']) -
+                 pd.to_datetime(ship['shipping_limit_date'])) / np.timedelta64(24, 'h')
+        wait = (pd.to_datetime(ship['order_delivered_customer_date']) -
+                purchase) / np.timedelta64(24, 'h')
+        delivered &= delay.notna().to_numpy() & wait.notna().to_numpy()
+
+        sums = {
+            'sales': accumulate(ship['price']),
+            'quantity': accumulate(),
+            'n_orders': accumulate(mask=first_item),
+            'n_reviews': accumulate(mask=reviewed),
+            'sum_review_score': accumulate(ship['review_score'], reviewed),
+            'n_five_stars': accumulate(ship['is_five_star'], reviewed),
+            'n_one_stars': accumulate(ship['is_one_star'], reviewed),
+            'n_delivered': accumulate(mask=delivered),
+            'sum_delay_to_carrier': accumulate(delay, delivered),
+            'sum_wait_time': accumulate(wait, delivered)
+        }
+
+        first_month = pd.Timestamp(year=month.min() // 12,
+                                   month=month.min() % 12 + 1,
+                                   day=1)
+        months = pd.date_range(first_month, periods=n_months, freq='MS')
+        return keys, months, sums
+
+    def _to_frame(self, sums):
+        key_codes, month_codes = np.nonzero(sums['quantity'])
+
+        def cell(name):
+            return sums[name][key_codes, month_codes]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            df = pd.DataFrame({
+                self.key: self.keys[key_codes],
+                'month': self.months[month_codes],
+                'n_orders': cell('n_orders'),
+                'quantity': cell('quantity'),
+                'sales': cell('sales'),
+                'share_of_five_stars': cell('n_five_stars') / cell('n_reviews'),
+                'share_of_one_stars': cell('n_one_stars') / cell('n_reviews'),
+                'review_score': cell('sum_review_score') / cell('n_reviews'),
+                'delay_to_carrier': np.maximum(
+                    cell('sum_delay_to_carrier') / cell('n_delivered'), 0),
+                'wait_time': cell('sum_wait_time') / cell('n_delivered')
+            })
+        df['quantity_per_order'] = df['quantity'] / df['n_orders']
+        return df
+
+    def get_monthly(self):
+        """
+        Returns a DataFrame with one row per (key, month) with sales:
+        key, 'month', 'n_orders', 'quantity', 'sales', 'share_of_five_stars',
+        'share_of_one_stars', 'review_score', 'delay_to_carrier', 'wait_time',
+        'quantity_per_order'
+        """
+        return self._to_frame(self.sums)
+
+    def get_rolling(self, window=3):
+        """
+        Same as `get_monthly`, aggregated over the `window` months
+        ending at each month
+        """
+        if window < 1:
+            raise ValueError(f"window must be at least 1 month, got {window}")
+        rolling = {}
+        for name, values in self.sums.items():
+            cumsum = np.cumsum(values, axis=1)
+            rolling[name] = cumsum.copy()
+            rolling[name][:, window:] -= cumsum[:, :-window]
+        return self._to_frame(rolling)
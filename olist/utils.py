@@ -1,4 +1,6 @@
 from math import radians, sin, cos, asin, sqrt
+import numpy as np
+import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
@@ -15,21 +17,28 @@ def haversine_distance(lon1, lat1, lon2, lat2):
     return 2 * 6371 * asin(sqrt(a))
 
 
-def return_significative_coef(model):
+def haversine_distances(lon1, lat1, lon2, lat2):
+    """
+    Vectorized haversine_distance: arrays of coordinates in, array of km out
+    """
+    lon1, lat1, lon2, lat2 = map(np.radians, [lon1, lat1, lon2, lat2])
+    a = np.sin((lat2 - lat1) / 2) ** 2 +\
+        np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371 * np.arcsin(np.sqrt(a))
+
+
+def return_significative_coef(model, alpha=0.05):
     """
     Returns p_value, lower and upper bound coefficients
     from a statsmodels object.
     """
-    # Extract p_values
-    p_values = model.pvalues.reset_index()
-    p_values.columns = ['variable', 'p_value']
-
-    # Extract coef_int
-    coef = model.params.reset_index()
-    coef.columns = ['variable', 'coef']
-    return p_values.merge(coef,
-                          on='variable')\
-                   .query("p_value<0.05").sort_values(by='coef',
+    # params and pvalues share the same index: no need to merge them
+    coef = pd.DataFrame({
+        'variable': model.params.index,
+        'p_value': model.pvalues.to_numpy(),
+        'coef': model.params.to_numpy()
+    })
+    return coef[coef['p_value'] < alpha].sort_values(by='coef',
                                                       ascending=False)
 
 
@@ -42,3 +51,79 @@ def plot_kde_plot(df, variable, dimension):
                       hue=dimension,
                       col=dimension)
     g.map(sns.kdeplot, variable)
+
+
+def binned_kde(values, groups=None, n_bins=1024, cut=3):
+    """
+    Gaussian KDE of `values` for each of `groups` (Scott's bandwidth,
+    as sns.kdeplot), computed in one pass: values are linearly binned on
+    a common grid of `n_bins` points, then convolved with each group's
+    kernel by FFT. Returns (grid, densities): densities is a DataFrame
+    indexed by group with one column per grid point.
+    """
+    values = np.asarray(values, dtype=float)
+    groups = np.zeros(len(values), dtype=int) if groups is None else np.asarray(groups)
+    known = ~np.isnan(values)
+    codes, labels = pd.factorize(groups[known], sort=True)
+    values = values[known]
+    n_groups = len(labels)
+
+    # Scott's rule per group: std * n ** (-1 / 5)
+    counts = np.bincount(codes, minlength=n_groups)
+    means = np.bincount(codes, weights=values, minlength=n_groups) / counts
+    variances = np.bincount(codes, weights=(values - means[codes]) ** 2,
+                            minlength=n_groups) / np.maximum(counts - 1, 1)
+    bandwidths = np.sqrt(variances) * counts ** (-1 / 5)
+    bandwidths[bandwidths == 0] = 1e-3 * (np.ptp(values) or 1)
+
+    grid = np.linspace(values.min() - cut * bandwidths.max(),
+                       values.max() + cut * bandwidths.max(), n_bins)
+    step = grid[1] - grid[0]
+
+    # Linear binning: each value is split between its two nearest grid points
+    position = (values - grid[0]) / step
+    left = np.minimum(np.floor(position).astype(int), n_bins - 2)
+    right_weight = position - left
+    hist = np.bincount(codes * n_bins + left, weights=1 - right_weight,
+                       minlength=n_groups * n_bins) +\
+        np.bincount(codes * n_bins + left + 1, weights=right_weight,
+                    minlength=n_groups * n_bins)
+    hist = hist.reshape(n_groups, n_bins) / counts[:, None]
+
+    # Kernels sampled on the grid offsets, centered at index 0 (circular)
+    n_fft = 2 * n_bins
+    offsets = np.fft.fftfreq(n_fft, 1 / n_fft) * step
+    kernels = np.exp(-0.5 * (offsets[None, :] / bandwidths[:, None]) ** 2) /\
+        (np.sqrt(2 * np.pi) * bandwidths[:, None])
+    densities = np.fft.irfft(np.fft.rfft(hist, n_fft) * np.fft.rfft(kernels, n_fft),
+                             n_fft)[:, :n_bins]
+    return grid, pd.DataFrame(np.maximum(densities, 0), index=labels)
+
+
+def plot_binned_kde_plot(df, variable, dimension, n_bins=1024):
+    """
+    Same plot as `plot_kde_plot` (one kde of `variable` per value of
+    `dimension`, side by side), with all kdes computed by `binned_kde`:
+    fast on large DataFrames
+    """
+    grid, densities = binned_kde(df[variable], df[dimension], n_bins)
+    fig, axes = plt.subplots(1, len(densities), sharex=True, sharey=True,
+                             figsize=(3 * len(densities), 3), squeeze=False)
+    colors = sns.color_palette(n_colors=len(densities))
+    for ax, color, (label, density) in zip(axes[0], colors, densities.iterrows()):
+        ax.plot(grid, density.to_numpy(), color=color)
+        ax.set_title(f"{dimension} = {label}")
+        ax.set_xlabel(variable)
+    axes[0][0].set_ylabel('Density')
+    fig.tight_layout()
+    return fig
+
+
+def plot_scatter(df, x, y, hue=None, max_points=10000, seed=0, **kwargs):
+    """
+    sns.scatterplot of at most `max_points` rows of `df`, sampled at
+    random: large frames render fast with the same overall shape
+    """
+    if len(df) > max_points:
+        df = df.sample(max_points, random_state=seed)
+    return sns.scatterplot(data=df, x=x, y=y, hue=hue, **kwargs)